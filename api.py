@@ -0,0 +1,357 @@
+import hashlib
+from datetime import datetime, timedelta, timezone
+
+from flask import Blueprint, Response, abort, current_app, jsonify, request
+
+from model import db, Venue, Artist, Show
+from cache import get_or_set
+from pagination import paginate
+from queries import (parse_datetime_arg, settled_before, show_window_query, name_search,
+                     cached_venue_profile, cached_artist_profile)
+
+# Versioned, read-only JSON API. Listings use the same keyset pagination as
+# the HTML pages and ?fields=a,b projects the SELECT to those columns. Every
+# response carries a strong ETag computed from the row versions
+# (version_id) of what it contains, and the versions are read first, so a
+# conditional GET that still matches is answered 304 without building a body.
+#
+# Single resources (a venue or artist with its shows, a show) also carry
+# Last-Modified: the newest updated_at among those rows, or for a profile the
+# start of its latest show that has begun, when that show moved from
+# upcoming to past. If-Modified-Since is honoured when If-None-Match is
+# absent. Naive timestamps are read as UTC, so the app and the database run
+# in UTC. Listings only have ETags: a row deleted from a page, or a show
+# leaving the upcoming window, moves no timestamp.
+api = Blueprint('api', __name__, url_prefix='/api/v1')
+
+# Endpoints outside the versioned resources: /api/changes, /api/lookup
+unversioned = Blueprint('unversioned', __name__, url_prefix='/api')
+
+VENUE_FIELDS = {
+    'id': Venue.id,
+    'name': Venue.name,
+    'genres': Venue.genres,
+    'address': Venue.address,
+    'city': Venue.city,
+    'state': Venue.state,
+    'phone': Venue.phone,
+    'website': Venue.website,
+    'facebook_link': Venue.facebook_link,
+    'image_link': Venue.image_link,
+    'seeking_talent': Venue.seeking_talent,
+    'seeking_description': Venue.seeking_description,
+    'upcoming_shows_count': Venue.upcoming_shows_count,
+    'past_shows_count': Venue.past_shows_count,
+}
+
+ARTIST_FIELDS = {
+    'id': Artist.id,
+    'name': Artist.name,
+    'genres': Artist.genres,
+    'city': Artist.city,
+    'state': Artist.state,
+    'phone': Artist.phone,
+    'website': Artist.website,
+    'facebook_link': Artist.facebook_link,
+    'image_link': Artist.image_link,
+    'seeking_venue': Artist.seeking_venue,
+    'seeking_description': Artist.seeking_description,
+    'upcoming_shows_count': Artist.upcoming_shows_count,
+    'past_shows_count': Artist.past_shows_count,
+}
+
+SHOW_FIELDS = {
+    'id': Show.id,
+    'start_time': Show.start_time,
+    'venue_id': Show.venue_id,
+    'venue_name': Venue.name,
+    'venue_image_link': Venue.image_link,
+    'artist_id': Show.artist_id,
+    'artist_name': Artist.name,
+    'artist_image_link': Artist.image_link,
+}
+
+
+def requested_fields(available):
+    # names from ?fields=, in request order; all of them when absent
+    names = request.args.get('fields')
+    if not names:
+        return list(available)
+    names = [n.strip() for n in names.split(',') if n.strip()]
+    unknown = [n for n in names if n not in available]
+    if unknown or not names:
+        abort(400, 'unknown fields: {}'.format(', '.join(unknown)))
+    return names
+
+
+def json_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, dict):
+        return {k: json_value(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [json_value(v) for v in value]
+    return value
+
+
+def make_etag(*parts):
+    return hashlib.sha1(repr(parts).encode('utf-8')).hexdigest()
+
+
+def last_modified(*timestamps):
+    """The newest of `timestamps` as an HTTP date, or None while it is still
+    within the current second.
+
+    HTTP dates have whole seconds, so a change later in the same second would
+    carry the same date; such a response gets no Last-Modified and cannot be
+    revalidated by date.
+    """
+    latest = max((t for t in timestamps if t is not None), default=None)
+    if latest is None or latest >= datetime.utcnow().replace(microsecond=0) - timedelta(seconds=1):
+        return None
+    return latest.replace(microsecond=0, tzinfo=timezone.utc)
+
+
+def not_modified(etag, modified=None):
+    # If-None-Match decides when present; If-Modified-Since only without it
+    if request.if_none_match:
+        matches = request.if_none_match.contains(etag)
+    else:
+        since = request.if_modified_since
+        matches = modified is not None and since is not None and modified <= since
+    if matches:
+        response = Response(status=304)
+        response.set_etag(etag)
+        if modified is not None:
+            # assigning None would stamp the current time
+            response.last_modified = modified
+        return response
+    return None
+
+
+def send(payload, etag, modified=None):
+    response = jsonify(json_value(payload))
+    response.set_etag(etag)
+    if modified is not None:
+        response.last_modified = modified
+    return response
+
+
+def list_resource(make_query, available, sort_columns, version_columns, id_column):
+    """Keyset-paginated listing of `make_query(columns)` projected to ?fields=.
+
+    The page is first selected as sort keys + row versions only; that is all
+    the ETag needs. The projected columns are then fetched for the ids on the
+    page, so only the requested columns are ever read.
+    """
+    fields = requested_fields(available)
+    n_keys = len(sort_columns)
+    page = paginate(make_query(sort_columns + version_columns), sort_columns,
+                    key=lambda row: tuple(row[:n_keys]))
+    etag = make_etag(fields, [tuple(row) for row in page.rows])
+    cached = not_modified(etag)
+    if cached is not None:
+        return cached
+
+    ids = [row[n_keys - 1] for row in page.rows]
+    rows = make_query([available[name] for name in fields]) \
+        .filter(id_column.in_(ids)).order_by(*sort_columns).all() if ids else []
+    return send({
+        'data': [dict(zip(fields, row)) for row in rows],
+        'next_cursor': page.next_cursor,
+        'prev_cursor': page.prev_cursor,
+    }, etag)
+
+
+def profile_version(model, fk_column, other, other_fk, entity_id):
+    # the entity's version and counters plus a digest of its shows and of the
+    # rows they pull names/images from, in one aggregate. The last four
+    # values are the timestamps profile_resource takes Last-Modified from
+    now = datetime.now()
+    row = db.session.query(
+        model.version_id, model.upcoming_shows_count, model.past_shows_count,
+        db.func.count(Show.id),
+        db.func.count(db.case((Show.start_time > now, Show.id))),
+        db.func.sum(Show.version_id),
+        db.func.sum(other.version_id),
+        model.updated_at,
+        db.func.max(Show.updated_at),
+        db.func.max(other.updated_at),
+        db.func.max(db.case((Show.start_time <= now, Show.start_time)))
+    ).outerjoin(Show, fk_column == model.id) \
+        .outerjoin(other, other.id == other_fk) \
+        .filter(model.id == entity_id) \
+        .group_by(model.id, model.version_id, model.upcoming_shows_count, model.past_shows_count,
+                  model.updated_at) \
+        .first()
+    if row is None:
+        abort(404)
+    return tuple(row)
+
+
+def profile_resource(version, build):
+    payload_fields = request.args.get('fields')
+    etag = make_etag(payload_fields, version)
+    modified = last_modified(*version[-4:])
+    cached = not_modified(etag, modified)
+    if cached is not None:
+        return cached
+    payload = build()
+    fields = requested_fields(payload)
+    return send({'data': {name: payload[name] for name in fields}}, etag, modified)
+
+
+#  Venues
+#  ----------------------------------------------------------------
+
+@api.route('/venues')
+def venues():
+    return list_resource(lambda columns: db.session.query(*columns), VENUE_FIELDS,
+                         [Venue.id], [Venue.version_id, Venue.upcoming_shows_count,
+                                      Venue.past_shows_count], Venue.id)
+
+
+@api.route('/venues/<int:venue_id>')
+def venue(venue_id):
+    version = profile_version(Venue, Show.venue_id, Artist, Show.artist_id, venue_id)
+    return profile_resource(version, lambda: cached_venue_profile(venue_id))
+
+
+#  Artists
+#  ----------------------------------------------------------------
+
+@api.route('/artists')
+def artists():
+    return list_resource(lambda columns: db.session.query(*columns), ARTIST_FIELDS,
+                         [Artist.id], [Artist.version_id, Artist.upcoming_shows_count,
+                                       Artist.past_shows_count], Artist.id)
+
+
+@api.route('/artists/<int:artist_id>')
+def artist(artist_id):
+    version = profile_version(Artist, Show.artist_id, Venue, Show.venue_id, artist_id)
+    return profile_resource(version, lambda: cached_artist_profile(artist_id))
+
+
+#  Shows
+#  ----------------------------------------------------------------
+
+@api.route('/shows')
+def shows():
+    # upcoming shows unless ?from=/?to= ask for another window, like /shows
+    window_from = parse_datetime_arg('from', default=datetime.now())
+    window_to = parse_datetime_arg('to')
+    return list_resource(lambda columns: show_window_query(columns, window_from, window_to),
+                         SHOW_FIELDS, [Show.start_time, Show.id],
+                         [Show.version_id, Venue.version_id, Artist.version_id], Show.id)
+
+
+@api.route('/shows/<int:show_id>')
+def show(show_id):
+    fields = requested_fields(SHOW_FIELDS)
+    show_query = db.session.query(Show) \
+        .join(Venue, Venue.id == Show.venue_id) \
+        .join(Artist, Artist.id == Show.artist_id) \
+        .filter(Show.id == show_id)
+    version = show_query.with_entities(Show.version_id, Venue.version_id, Artist.version_id,
+                                       Show.updated_at, Venue.updated_at, Artist.updated_at).first()
+    if version is None:
+        abort(404)
+    etag = make_etag(fields, tuple(version[:3]))
+    modified = last_modified(*version[3:])
+    cached = not_modified(etag, modified)
+    if cached is not None:
+        return cached
+    row = show_query.with_entities(*[SHOW_FIELDS[name] for name in fields]).one()
+    return send({'data': dict(zip(fields, row))}, etag, modified)
+
+
+#  Changes
+#  ----------------------------------------------------------------
+
+CHANGE_KINDS = (('venue', Venue), ('artist', Artist), ('show', Show))
+
+
+def changes_query(since=None, before=None):
+    # (type, id, created_at, updated_at) of every row changed after `since`
+    # and before `before`, one branch per table so each can use its
+    # (updated_at, id) index
+    branches = []
+    for kind, model in CHANGE_KINDS:
+        branch = db.select(db.literal(kind).label('type'), model.id.label('id'),
+                           model.created_at.label('created_at'),
+                           model.updated_at.label('updated_at'))
+        if before is not None:
+            branch = branch.where(model.updated_at < before)
+        if since is not None:
+            branch = branch.where(model.updated_at > since)
+        branches.append(branch)
+    feed = db.union_all(*branches).subquery('changes')
+    return db.session.query(feed), feed
+
+
+@unversioned.route('/changes')
+def change_feed():
+    """Rows created or updated after ?since=, oldest change first.
+
+    Follow next_cursor to the end, then keep the last updated_at as the next
+    ?since=. Changes from the last CHANGES_SETTLE_SECONDS are held back until
+    they can no longer be overtaken (see queries.settled_before). Deletes
+    are not reported.
+    """
+    query, feed = changes_query(parse_datetime_arg('since'), settled_before())
+    sort_columns = [feed.c.updated_at, feed.c.type, feed.c.id]
+    page = paginate(query, sort_columns,
+                    key=lambda row: (row.updated_at, row.type, row.id))
+    return jsonify(json_value({
+        'data': [dict(row._mapping, action='created' if row.created_at == row.updated_at else 'updated')
+                 for row in page.rows],
+        'next_cursor': page.next_cursor,
+        'prev_cursor': page.prev_cursor,
+    }))
+
+
+#  Lookup
+#  ----------------------------------------------------------------
+
+LOOKUP_MODELS = {'artist': Artist, 'venue': Venue}
+
+
+def lookup_rows(model, term, limit):
+    query = db.session.query(model.id, model.name)
+    if term:
+        match, ranking = name_search(model.name, term)
+        query = query.filter(match).order_by(*ranking, model.id)
+    else:
+        query = query.order_by(model.name, model.id)
+    return [{'id': row.id, 'name': row.name} for row in query.limit(limit)]
+
+
+@unversioned.route('/lookup')
+def lookup():
+    """Ids and names only, for the type-ahead pickers: ?kind=artist|venue&q=.
+
+    Answers come from their own small cache, so a burst of keystrokes
+    cannot evict profile payloads, and may be LOOKUP_CACHE_TIMEOUT seconds
+    stale, which is fine for suggestions.
+    """
+    kind = request.args.get('kind')
+    if kind not in LOOKUP_MODELS:
+        abort(400, 'kind must be one of: {}'.format(', '.join(sorted(LOOKUP_MODELS))))
+    term = request.args.get('q', '').strip()[:100]
+    limit = min(max(request.args.get('limit', 10, type=int), 1), current_app.config['LOOKUP_MAX_RESULTS'])
+    timeout = current_app.config['LOOKUP_CACHE_TIMEOUT']
+    key = '{}:{}:{}'.format(kind, limit, term.lower())
+    rows = get_or_set(current_app.extensions['lookup_cache'], key,
+                      lambda: lookup_rows(LOOKUP_MODELS[kind], term, limit), timeout)
+    response = jsonify({'data': rows})
+    response.cache_control.public = True
+    response.cache_control.max_age = timeout
+    return response
+
+
+@api.errorhandler(400)
+@api.errorhandler(404)
+@unversioned.errorhandler(400)
+def api_error(error):
+    return jsonify({'error': error.description}), error.code
@@ -6,10 +6,13 @@ from dataclasses import dataclass
 from difflib import diff_bytes
 from distutils.command.config import config
 from email.policy import default
+import hmac
 import json
+from functools import lru_cache
+from itertools import groupby
 import dateutil.parser
 import babel
-from flask import Flask, render_template, request, Response, flash, redirect, url_for
+from flask import Flask, render_template, request, Response, flash, redirect, url_for, abort, jsonify
 from flask_moment import Moment
 from flask_sqlalchemy import SQLAlchemy
 import logging,sys
@@ -19,6 +22,20 @@ from flask_migrate import Migrate
 from datetime import date
 from forms import *
 from model import *
+from pagination import paginate
+from cache import make_cache
+from queries import *
+from read_models import venue_row, artist_row, form_data
+from loading import init_lazy_load_guard
+from counters import counters_cli
+from areas import areas_cli, place
+from metrics import init_pool_metrics, init_request_metrics, pool_stats, request_metrics
+from api import api, unversioned, profile_version
+from importer import import_command
+from exporter import export_command, exports
+from show_writer import ShowRejected, create_show, init_show_writer
+from templating import init_templates
+from http_cache import cached_page, init_http_cache, table_version
 
 #----------------------------------------------------------------------------#
 # App Config.
@@ -28,11 +45,29 @@ app = Flask(__name__)
 moment = Moment(app)
 app.config.from_object('config')
 
-# TODO: connect to a local postgresql database
+init_pool_metrics(app)
 db.init_app(app)
-migrate = Migrate(app,db)
-
-app.config["CACHE_TYPE"] = "null"
+init_lazy_load_guard(app)
+migrate = Migrate(app, db, render_as_batch=True)
+app.cli.add_command(counters_cli)
+app.cli.add_command(areas_cli)
+app.cli.add_command(import_command)
+app.cli.add_command(export_command)
+init_request_metrics(app)
+app.register_blueprint(api)
+app.register_blueprint(unversioned)
+app.register_blueprint(exports)
+
+# assembled venue/artist profile payloads, see queries.venue_profile/artist_profile
+profile_cache = app.extensions['profile_cache'] = make_cache(app.config)
+# /api/lookup type-ahead answers, apart from the profiles (api.lookup)
+lookup_cache = app.extensions['lookup_cache'] = make_cache(
+  app.config, app.config['LOOKUP_CACHE_MAX_ENTRIES'], key_prefix='fyyur:lookup:')
+# genre facet counts of the listings (queries.cached_genre_facets)
+facet_cache = app.extensions['facet_cache'] = make_cache(
+  app.config, app.config['FACET_CACHE_MAX_ENTRIES'], key_prefix='fyyur:facets:')
+init_show_writer(app)
+init_http_cache(app)
 
 #----------------------------------------------------------------------------#
 # Models.
@@ -41,21 +76,51 @@ app.config["CACHE_TYPE"] = "null"
 # Filters.
 #----------------------------------------------------------------------------#
 
-def format_datetime(value, format='medium'):
-  date = dateutil.parser.parse(value)
-  if format == 'full':
-      format="EEEE MMMM, d, y 'at' h:mma"
-  elif format == 'medium':
-      format="EE MM, dd, y h:mma"
-  return babel.dates.format_datetime(date, format, locale='en')
+DATETIME_FORMATS = {
+  'full': "EEEE MMMM, d, y 'at' h:mma",
+  'medium': "EE MM, dd, y h:mma",
+}
+
+@lru_cache(maxsize=None)
+def datetime_pattern(format, locale):
+  # parsed Babel pattern and locale, once per (format, locale)
+  return (babel.dates.parse_pattern(DATETIME_FORMATS.get(format, format)),
+          babel.Locale.parse(locale))
+
+@lru_cache(maxsize=4096)
+def formatted_datetime(value, format, locale):
+  # listings repeat the same start times a lot, so the output is memoized
+  pattern, locale = datetime_pattern(format, locale)
+  return pattern.apply(value, locale)
+
+def format_datetime(value, format='medium', locale='en'):
+  # takes datetimes as they come from the database; strings (e.g. from an
+  # old cached payload) are still parsed
+  if isinstance(value, str):
+    value = dateutil.parser.parse(value)
+  return formatted_datetime(value, format, locale)
 
 app.jinja_env.filters['datetime'] = format_datetime
 
+#----------------------------------------------------------------------------#
+# Pagination.
+#----------------------------------------------------------------------------#
+
+@app.template_global()
+def page_url(**cursor):
+  # url of the current listing with the same filters and a different cursor
+  args = request.args.to_dict(flat=False)
+  args.pop('after', None)
+  args.pop('before', None)
+  args.update(cursor)
+  return url_for(request.endpoint, **args)
+
 #----------------------------------------------------------------------------#
 # Controllers.
 #----------------------------------------------------------------------------#
 
 @app.route('/')
+@cached_page('index')
 def index():
   return render_template('pages/home.html')
 
@@ -64,61 +129,74 @@ def index():
 #  ----------------------------------------------------------------
 
 @app.route('/venues')
+@cached_page('listing', lambda: table_version(Venue))
 def venues():
-  # TODO: replace with real venues data.
-  #       num_upcoming_shows should be aggregated based on number of upcoming shows per venue.
-  data =[]  #emtpty existint data dictionary
-  #refer view Venues.html for argument to be passed
-  #get distinct state and city
-  distinct_statecity = Venue.query.with_entities(Venue.state,Venue.city).distinct()
-
-  for dsc in distinct_statecity:
-      s_state = dsc.state
-      c_city = dsc.city
-      v_venue =[]  # for adding list venues in data[] dictionary
-      venue_filter  = Venue.query.filter_by(state=s_state,city=c_city).all()
-      for v in venue_filter:
-        #though count is not displayed in all Venues form
-        count_upcoming_show = Show.query.filter_by(venue_id=v.id).filter(Show.start_time > datetime.now() ).count() 
-        v_venue.append({
-          "id":v.id,
-          "name": v.name,
-          "num_upcoming_shows": count_upcoming_show
-        })
-
-      # append venue details with upcoming show to final data
-      data.append({
-        "city":c_city,
-        "state":s_state,
-        "venues":v_venue
-      })
-
-  return render_template('pages/venues.html', areas=data)
+  # num_upcoming_shows is the venue's maintained counter, and areas are
+  # rows of their own, so the listing walks the area index and each area's
+  # venues off the area_id index.
+  venue_query = db.session.query(
+      Venue.id, Venue.name, Venue.upcoming_shows_count.label('num_upcoming_shows'),
+      Area.id.label('area_id'), Area.city, Area.state, Area.city_key
+    ).join(Area, Venue.area_id == Area.id)
+  genres = genre_args()
+  venue_query = filter_genres(venue_query, Venue.genres, genres)
+  page = paginate(venue_query, [Area.state, Area.city_key, Venue.id],
+                  key=lambda v: (v.state, v.city_key, v.id))
+
+  # rows come back sorted by area, so one pass is enough to build the
+  # list of areas (refer view Venues.html for argument to be passed)
+  data = []
+  for (area_id, c_city, s_state), area_rows in groupby(page.rows, key=lambda v: (v.area_id, v.city, v.state)):
+    data.append({
+      "id": area_id,
+      "city": c_city,
+      "state": s_state,
+      "venues": [{
+        "id": v.id,
+        "name": v.name,
+        "num_upcoming_shows": v.num_upcoming_shows
+      } for v in area_rows]
+    })
+
+  return render_template('pages/venues.html', areas=data,
+                         facets=cached_genre_facets(table_version(Venue), venue_query, Venue.genres, genres),
+                         selected_genres=genres, next_cursor=page.next_cursor, prev_cursor=page.prev_cursor)
+
+@app.route('/areas/<int:area_id>')
+@cached_page('listing', lambda area_id: table_version(Venue, Artist))
+def show_area(area_id):
+  # venues and artists of one area, each a range of its (area_id, name) index
+  area = Area.query.get_or_404(area_id)
+  area_venues = db.session.query(
+      Venue.id, Venue.name, Venue.upcoming_shows_count.label('num_upcoming_shows')
+    ).filter(Venue.area_id == area_id).order_by(Venue.name).all()
+  area_artists = db.session.query(
+      Artist.id, Artist.name, Artist.upcoming_shows_count.label('num_upcoming_shows')
+    ).filter(Artist.area_id == area_id).order_by(Artist.name).all()
+  return render_template('pages/area.html', area=area,
+                         venues=area_venues, artists=area_artists)
 
 @app.route('/venues/search', methods=['POST'])
 def search_venues():
-  # TODO: implement search on venues with partial string search. Ensure it is case-insensitive.
+  # partial, case-insensitive search on venue name.
   # seach for Hop should return "The Musical Hop".
   # search for "Music" should return "The Musical Hop" and "Park Square Live Music & Coffee"
   search_term = request.form.get('search_term', '')
-  data_venue=[]  # to get venue list temporary and later will add to response data
-  response_data=[]
-  search  = "%{}%".format(search_term)
-  #if using filter use db.users.name object
-  s_venue = Venue.query.filter(Venue.name.like(search)).all()
-  
-  for v in s_venue:
-    data_venue.append({ 
-      "id" : v.id,
-      "name" :v.name,
-      "num_upcoming_shows": Show.query.filter(Show.venue_id==v.id).filter(Show.start_time > datetime.now() ).count()
-    })
-    
-  response_data.append({
+  match, ranking = name_search(Venue.name, search_term)
+  genres = genre_args()
+  venue_query = filter_genres(db.session.query(
+      Venue.id, Venue.name, Venue.upcoming_shows_count.label('num_upcoming_shows')
+    ).filter(match), Venue.genres, genres)
+  s_venue = venue_query.order_by(*ranking).all()
+
+  response_data = {
     'count': len(s_venue),
-    'data' : data_venue
-  })
- 
+    'data': [{
+      "id": v.id,
+      "name": v.name,
+      "num_upcoming_shows": v.num_upcoming_shows
+    } for v in s_venue]
+  }
 
   # response={
   #   "count": 1,
@@ -128,65 +206,15 @@ def search_venues():
   #     "num_upcoming_shows": 0,
   #   }]
   #}
-  return render_template('pages/search_venues.html', results=response_data[0], search_term=request.form.get('search_term', ''))
+  return render_template('pages/search_venues.html', results=response_data, search_term=request.form.get('search_term', ''),
+                         facets=genre_facets(venue_query, Venue.genres, genres), selected_genres=genres)
 
 @app.route('/venues/<int:venue_id>')
+@cached_page('profile', lambda venue_id: profile_version(
+  Venue, Show.venue_id, Artist, Show.artist_id, venue_id))
 def show_venue(venue_id):
   # shows the venue page with the given venue_id
-  # TODO: replace with real venue data from the venues table, using venue_id
-    # get venue by primary_key
-  v_venue = Venue.query.get(venue_id)
-  
-  #declare blank datadic
-  data1 =[]
-  d_past_shows=[]
-  d_upcom_shows =[]
-   
-  #get past shows and upcoming shows filter by venue_id and current date
-  #p_shows = Show.query.filter_by(venue_id=venue_id).filter(Show.start_time <= datetime.now() ).all()
-  #p_shows = Show.query.filter_by(venue_id=venue_id).filter(Show.start_time > datetime.now() ).all()
-
-  #get show and artist detaisl with joining both tabels
-  all_shows = db.session.query(Artist,Show.start_time).join(Show).filter(Show.venue_id == venue_id) #(Artist, Show.start_time).join(Show).filter(Show.venue_id == venue_id)
-
-  for artist,start_time in all_shows:
-     #add to list of upcoming shows
-      if start_time > datetime.now():
-        d_upcom_shows.append({
-        "artist_id": artist.id,
-        "artist_name": artist.name,
-        "artist_image_link": artist.image_link,
-        "start_time": str(start_time)
-        })          
-      else:
-        #add to list of past shows
-        d_past_shows.append({
-        "artist_id": artist.id,
-        "artist_name": artist.name,
-        "artist_image_link": artist.image_link,
-        "start_time": str(start_time)
-        })
-
-  data1 =({
-    "id": venue_id,
-    "name": v_venue.name, 
-    "genres": v_venue.genres,
-    "address":v_venue.address ,
-    "city": v_venue.city,
-    "state": v_venue.state,
-    "phone": v_venue.phone,
-    "website": v_venue.website,
-    "facebook_link": v_venue.facebook_link,
-    "seeking_talent": v_venue.seeking_talent,
-    "seeking_description": v_venue.seeking_description,
-    "image_link": v_venue.image_link,
-    "past_shows":d_past_shows,
-    "upcoming_shows": d_upcom_shows,
-    "past_shows_count": len(d_past_shows),
-    "upcoming_shows_count":len(d_upcom_shows) ,
-
-  })
-
+  data1 = cached_venue_profile(venue_id)
   return render_template('pages/show_venue.html', venue=data1)
 
 #  Create Venue
@@ -211,8 +239,6 @@ def create_venue_submission():
         venue = Venue(  #instatiate Class object   
           #id : Primary key
           name = name,
-          city = form.city.data,
-          state = form.state.data,
           address = form.address.data,
           phone = form.phone.data,
           image_link = form.image_link.data,
@@ -222,6 +248,7 @@ def create_venue_submission():
           seeking_description = form.seeking_description.data,
           genres = form.genres.data,
           )
+        place(venue, form.city.data, form.state.data)
         db.session.add(venue)
         db.session.commit()
       else:
@@ -264,8 +291,10 @@ def delete_venue(venue_id):
   error = False
    # SQLAlchemy ORM to delete a record. Handle cases where the session commit could fail.
   try:
+    stale_keys = venue_cache_keys(venue_id)
     db.session.delete(venue)
-    db.session.commt()
+    db.session.commit()
+    profile_cache.delete_many(*stale_keys)
   except:
     error = True
     db.session.rollback()
@@ -286,36 +315,37 @@ def delete_venue(venue_id):
 #  Artists
 #  ----------------------------------------------------------------
 @app.route('/artists')
+@cached_page('listing', lambda: table_version(Artist))
 def artists():
-  # TODO: replace with real data returned from querying the database
-
-  data = Artist.query.with_entities(Artist.id,Artist.name).all()
-  return render_template('pages/artists.html', artists=data)
+  genres = genre_args()
+  artist_query = filter_genres(Artist.query.with_entities(Artist.id, Artist.name),
+                               Artist.genres, genres)
+  page = paginate(artist_query, [Artist.id], key=lambda a: (a.id,))
+  return render_template('pages/artists.html', artists=page.rows,
+                         facets=cached_genre_facets(table_version(Artist), artist_query, Artist.genres, genres),
+                         selected_genres=genres, next_cursor=page.next_cursor, prev_cursor=page.prev_cursor)
 
 @app.route('/artists/search', methods=['POST'])
 def search_artists():
-  # TODO: implement search on artists with partial string search. Ensure it is case-insensitive.
+  # partial, case-insensitive search on artist name.
   # seach for "A" should return "Guns N Petals", "Matt Quevado", and "The Wild Sax Band".
   # search for "band" should return "The Wild Sax Band".
   search_term = request.form.get('search_term', '')
-  data_artists= []  # to get venue list temporary and later will add to response data
-  response_data=[]
-  search  = "%{}%".format(search_term)
-  #if using filter use db.users.name object
-  s_artist = Artist.query.filter(Artist.name.like(search)).all()
-  
-  for art in s_artist:
-    data_artists.append({
-      "id" : art.id,
-      "name" :art.name,
-      "num_upcoming_shows": Show.query.filter(Artist.id==art.id).filter(Show.start_time > datetime.now() ).count()
-    })
-    
-  response_data.append({
+  match, ranking = name_search(Artist.name, search_term)
+  genres = genre_args()
+  artist_query = filter_genres(db.session.query(
+      Artist.id, Artist.name, Artist.upcoming_shows_count.label('num_upcoming_shows')
+    ).filter(match), Artist.genres, genres)
+  s_artist = artist_query.order_by(*ranking).all()
+
+  response_data = {
     'count': len(s_artist),
-    'data' : data_artists
-  })
- 
+    'data': [{
+      "id": a.id,
+      "name": a.name,
+      "num_upcoming_shows": a.num_upcoming_shows
+    } for a in s_artist]
+  }
 
   # response={
   #   "count": 1,
@@ -325,93 +355,26 @@ def search_artists():
   #     "num_upcoming_shows": 0,
   #   }]
   #}
-  return render_template('pages/search_artists.html', results=response_data[0], search_term=request.form.get('search_term', ''))
+  return render_template('pages/search_artists.html', results=response_data, search_term=request.form.get('search_term', ''),
+                         facets=genre_facets(artist_query, Artist.genres, genres), selected_genres=genres)
 
   
 
 @app.route('/artists/<int:artist_id>')
+@cached_page('profile', lambda artist_id: profile_version(
+  Artist, Show.artist_id, Venue, Show.venue_id, artist_id))
 def show_artist(artist_id):
   # shows the artist page with the given artist_id
-  # TODO: replace with real artist data from the artist table, using artist_id
-
-  a_artist = Artist.query.get(artist_id)
-  #declare blank datadic
-  data1 =[]
-  d_past_shows=[]
-  d_upcom_shows =[]
-
- 
-  #get past shows and upcoming shows filter by venue_id and current date
-  #p_shows = Show.query.filter_by(artist_id=artist_id).filter(Show.start_time <= datetime.now() ).all()
-  #up_shows = Show.query.filter_by(artist_id=artist_id).filter(Show.start_time > datetime.now() ).all()
-
- #get show and artist detaisl with joining both tabels
-  all_shows = db.session.query(Venue,Show.start_time).join(Show).filter(Show.artist_id == artist_id) #(Artist, Show.start_time).join(Show).filter(Show.venue_id == venue_id)
-
-  for venue, start_time in all_shows:
-      #add to list
-      if start_time > datetime.now():
-        d_upcom_shows.append({
-        "venue_id": venue.id,
-        "venue_name": venue.name,
-        "venue_image_link": venue.image_link,
-        "start_time": str(start_time)
-        })
-      else:
-        d_past_shows.append({
-        "venue_id": venue.id,
-        "venue_name": venue.name,
-        "venue_image_link": venue.image_link,
-        "start_time": str(start_time)
-  })
-
-  
-  
-
-  data1={
-    "id": artist_id,
-    "name": a_artist.name,
-    "genres": a_artist.genres, ## convert to comma seprated values
-    "city": a_artist.city,
-    "state": a_artist.state,
-    "phone": a_artist.phone,
-    "website":a_artist.website,
-    "facebook_link": a_artist.facebook_link,
-    "seeking_venue": a_artist.seeking_venue,
-    "seeking_description": a_artist.seeking_description,
-    "image_link": a_artist.image_link,
-    "past_shows":d_past_shows ,
-    "upcoming_shows": d_upcom_shows,
-    "past_shows_count": len(d_past_shows),
-    "upcoming_shows_count": len(d_upcom_shows),
-  }  
+  data1 = cached_artist_profile(artist_id)
   return render_template('pages/show_artist.html', artist=data1)
 
 #  Update
 #  ----------------------------------------------------------------
 @app.route('/artists/<int:artist_id>/edit', methods=['GET'])
 def edit_artist(artist_id):
-  #get Artist by primary key
-  data_artist = Artist.query.get(artist_id)
- 
-  data_artist.website_link=data_artist.website #mismatch between form and database columns. 
-  # assign form fields pass object
-  form = ArtistForm(obj=data_artist)
-  artist={
-    "id": artist_id,
-    "name": data_artist.name,
-    "genres": data_artist.genres,
-    "city": data_artist.city,
-    "state": data_artist.state,
-    "phone": data_artist.phone,
-    "website_link":data_artist.website,
-    "facebook_link": data_artist.facebook_link,
-    "seeking_venue": data_artist.seeking_venue,
-    "seeking_description": data_artist.seeking_description,
-    "image_link": data_artist.image_link,
-  }
-  
-  # TODO: populate form with fields from artist with ID <artist_id>
+  # the form is filled from a plain row; nothing is loaded into the session
+  artist = artist_row(artist_id)
+  form = ArtistForm(data=form_data(artist))
   return render_template('forms/edit_artist.html', form=form, artist=artist)
 
 @app.route('/artists/<int:artist_id>/edit', methods=['POST'])
@@ -425,8 +388,7 @@ def edit_artist_submission(artist_id):
     # start to edit the data after take them from the form
       a_artist.name=form.name.data
       a_artist.genres=form.genres.data
-      a_artist.city=form.city.data
-      a_artist.state=form.state.data
+      place(a_artist, form.city.data, form.state.data)
       a_artist.phone=form.phone.data
       a_artist.image_link=form.image_link.data
       a_artist.facebook_link=form.facebook_link.data
@@ -435,6 +397,7 @@ def edit_artist_submission(artist_id):
       a_artist.website=form.website_link.data
       
       db.session.commit()
+      profile_cache.delete_many(*artist_cache_keys(artist_id))
   except:
     error = True
     db.session.rollback()
@@ -450,27 +413,8 @@ def edit_artist_submission(artist_id):
 
 @app.route('/venues/<int:venue_id>/edit', methods=['GET'])
 def edit_venue(venue_id):
-  data_venue = Venue.query.get(venue_id)
-  data_venue.website_link=data_venue.website # tosync formname and db returned columns names
-    
-    # assign form fields pass object
-  form = VenueForm(obj=data_venue)
-  venue={
-    "id": venue_id,
-    "name": data_venue.name,
-    "genres": data_venue.genres,
-    "address":  data_venue.address,
-    "city":  data_venue.city,
-    "state": data_venue.state,
-    "phone":  data_venue.phone,
-    "website_link":  data_venue.website,
-    "facebook_link":  data_venue.facebook_link,
-    "seeking_talent":  data_venue.seeking_talent,
-    "seeking_description":  data_venue.seeking_description,
-    "image_link": data_venue.image_link,
-    }
-
-   # TODO: populate form with values from venue with ID <venue_id>
+  venue = venue_row(venue_id)
+  form = VenueForm(data=form_data(venue))
   return render_template('forms/edit_venue.html', form=form, venue=venue)
 
 @app.route('/venues/<int:venue_id>/edit', methods=['POST'])
@@ -485,8 +429,7 @@ def edit_venue_submission(venue_id):
       # start to edit the data after take them from the form
         a_venue.name=form.name.data
         a_venue.genres=form.genres.data
-        a_venue.city=form.city.data
-        a_venue.state=form.state.data
+        place(a_venue, form.city.data, form.state.data)
         a_venue.phone=form.phone.data
         a_venue.image_link=form.image_link.data
         a_venue.facebook_link=form.facebook_link.data
@@ -495,6 +438,7 @@ def edit_venue_submission(venue_id):
         a_venue.website=form.website_link.data
         
         db.session.commit()
+        profile_cache.delete_many(*venue_cache_keys(venue_id))
   except Exception as err:
       error = True
       errordesc = f"{err.__class__.__name__}: {err}"
@@ -534,8 +478,6 @@ def create_artist_submission():
           artist = Artist(
               #id : Primary key
               name = name,
-              city = form.city.data,
-              state = form.state.data,        
               phone = form.phone.data,
               image_link = form.image_link.data,
               facebook_link = form.facebook_link.data,
@@ -544,6 +486,7 @@ def create_artist_submission():
               seeking_description = form.seeking_description.data,
               genres = form.genres.data,
               )
+          place(artist, form.city.data, form.state.data)
           db.session.add(artist)
           db.session.commit()
       else:
@@ -576,23 +519,52 @@ def create_artist_submission():
 #  ----------------------------------------------------------------
 
 @app.route('/shows')
+@cached_page('listing', lambda: table_version(Show, Venue, Artist))
 def shows():
-  # displays list of shows at /shows
-  # TODO: replace with real venues data.
-  data =[]
-  all_shows = Show.query.all()
-  
-  for s in all_shows:
-    data.append({
-      "venue_id":s.venue_id,
-      "venue_name": Venue.query.with_entities(Venue.name).filter(Venue.id==s.venue_id).first().name,
+  # displays list of shows at /shows, upcoming ones unless ?from=/?to= ask
+  # for another window. venue and artist columns come from one joined,
+  # column-projected query instead of three lookups per show
+  window_from = parse_datetime_arg('from', default=datetime.now())
+  window_to = parse_datetime_arg('to')
+  show_query = show_window_query([
+      Show.id,
+      Show.venue_id,
+      Venue.name.label('venue_name'),
+      Show.artist_id,
+      Artist.name.label('artist_name'),
+      Artist.image_link.label('artist_image_link'),
+      Show.start_time
+    ], window_from, window_to)
+  # ?genre= filters on the performing artist's genres
+  genres = genre_args()
+  show_query = filter_genres(show_query, Artist.genres, genres)
+  page = paginate(show_query, [Show.start_time, Show.id],
+                  key=lambda s: (s.start_time, s.id))
+
+  data = [{
+      "venue_id": s.venue_id,
+      "venue_name": s.venue_name,
       "artist_id": s.artist_id,
-      "artist_name": Artist.query.with_entities(Artist.name).filter(Artist.id==s.artist_id).first().name,
-      "artist_image_link":Artist.query.with_entities(Artist.image_link).filter(Artist.id==s.artist_id).first().image_link,
-      "start_time": format_datetime(str(s.start_time))
-    })
-
-  return render_template('pages/shows.html', shows=data)
+      "artist_name": s.artist_name,
+      "artist_image_link": s.artist_image_link,
+      # formatted once, by the datetime filter in pages/shows.html
+      "start_time": s.start_time
+    } for s in page.rows]
+
+  return render_template('pages/shows.html', shows=data,
+                         facets=cached_genre_facets(
+                           (table_version(Show, Venue, Artist), request.args.get('from'), request.args.get('to')),
+                           show_query, Artist.genres, genres),
+                         selected_genres=genres, next_cursor=page.next_cursor, prev_cursor=page.prev_cursor)
+
+@app.route('/shows/submissions/<ticket>')
+def show_submission(ticket):
+  # outcome of a show queued with SHOW_WRITE_MODE = 'queued'
+  writer = app.extensions.get('show_writer')
+  status = writer.status(ticket) if writer is not None else None
+  if status is None:
+    abort(404)
+  return jsonify(status)
 
 @app.route('/shows/create')
 def create_shows():
@@ -603,43 +575,56 @@ def create_shows():
 @app.route('/shows/create', methods=['POST'])
 def create_show_submission():
   # called to create new shows in the db, upon submitting new show listing form
-  # TODO: insert form data as a new Show record in the db, instead
-  form = ShowForm()
-  # called upon submitting the new artist listing form
-  # TODO: insert form data as a new Venue record in the db, instead
-  # TODO: modify data to be the data object returned from db insertion
-  
-  error = False
+  form = ShowForm(request.form, meta={'csrf': False})
+  if not form.validate_on_submit():
+    flash('Show could not be listed: ' + '; '.join(
+      field + ' ' + '|'.join(err) for field, err in form.errors.items()))
+    return render_template('pages/home.html')
+
+  venue_id = int(form.venue_id.data)
+  artist_id = int(form.artist_id.data)
+  writer = app.extensions.get('show_writer')
+  if writer is not None:
+    # queued mode: acknowledged now, written with the next batch
+    ticket = writer.submit(venue_id, artist_id, form.start_time.data)
+    flash('Show was submitted and will be listed shortly (ticket {}).'.format(ticket))
+    return render_template('pages/home.html')
+
   try:
-    #instatiate Class object
-    show = Show(
-        #id : Primary key
-        venue_id = form.venue_id.data,
-        artist_id = form.artist_id.data,
-        start_time = form.start_time.data        
-        )
-    db.session.add(show)
-    db.session.commit()
-  except:
-      error = True
-      db.session.rollback()
-  finally:  
-    db.session.close()
-  
-  if error :
+    create_show(profile_cache, venue_id, artist_id, form.start_time.data)
+    flash('Show was successfully listed!')
+  except ShowRejected as e:
+    flash('Show could not be listed: ' + '; '.join(
+      field + ' ' + '|'.join(err) for field, err in e.errors.items()))
+  except Exception:
+    db.session.rollback()
+    app.logger.exception('create_show_submission')
     flash('Some error encountered! Show was not listed!')
-  else:
-     flash('Show was successfully listed!')
-  # on successful db insert, flash success
-  # flash('Artist ' + request.form['name'] + ' was successfully listed!')
-  # TODO: on unsuccessful db insert, flash an error instead.
-  # e.g., flash('An error occurred. Artist ' + data.name + ' could not be listed.')
-  # on successful db insert, flash success
-  # TODO: on unsuccessful db insert, flash an error instead.
-  # e.g., flash('An error occurred. Show could not be listed.')
-  # see: http://flask.pocoo.org/docs/1.0/patterns/flashing/
+  finally:
+    db.session.close()
   return render_template('pages/home.html')
 
+#  Internal
+#  ----------------------------------------------------------------
+
+@app.route('/internal/stats')
+def internal_stats():
+  # pool and cache gauges for sizing DB_POOL_SIZE against the worker count,
+  # plus per-endpoint query counts and timings
+  token = app.config.get('INTERNAL_STATS_TOKEN')
+  if not token:
+    abort(404)
+  supplied = request.headers.get('Authorization', '')
+  if not hmac.compare_digest(supplied.encode('utf-8'), 'Bearer {}'.format(token).encode('utf-8')):
+    abort(401)
+  return jsonify({
+    'pool': pool_stats.snapshot(db.engine.pool),
+    'profile_cache': profile_cache.stats(),
+    'lookup_cache': lookup_cache.stats(),
+    'facet_cache': facet_cache.stats(),
+    'endpoints': request_metrics.snapshot(),
+  })
+
 @app.errorhandler(404)
 def not_found_error(error):
     return render_template('errors/404.html'), 404
@@ -659,6 +644,14 @@ if not app.debug:
     app.logger.addHandler(file_handler)
     app.logger.info('errors')
 
+#----------------------------------------------------------------------------#
+# Templates.
+#----------------------------------------------------------------------------#
+
+# last, so every filter and template global above is registered before the
+# templates are precompiled
+init_templates(app)
+
 #----------------------------------------------------------------------------#
 # Launch.
 #----------------------------------------------------------------------------#
@@ -0,0 +1,94 @@
+import click
+from flask.cli import AppGroup
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+
+from model import db, Area, Venue, Artist
+
+# Venues and artists point at a shared Area row instead of grouping on the
+# free-text city/state they were typed with. Writes go through area_for(),
+# which normalizes the pair so "San Francisco" and "san francisco " land in
+# the same area; the city/state columns keep the normalized spelling for the
+# pages and the API.
+
+
+def normalize_area(city, state):
+    # (city, state, city_key): whitespace collapsed, a city typed all in one
+    # case title-cased, state upper-cased; city_key is what makes two
+    # spellings the same area
+    city = ' '.join((city or '').split())
+    if city.islower() or city.isupper():
+        city = city.title()
+    state = (state or '').strip().upper()
+    return city, state, city.casefold()
+
+
+def area_for(city, state):
+    """The Area for a typed city/state, created on first use."""
+    city, state, city_key = normalize_area(city, state)
+    if not city or not state:
+        raise ValueError('an area needs a city and a state')
+    area = Area.query.filter_by(state=state, city_key=city_key).first()
+    if area is not None:
+        return area
+    area = Area(city=city, state=state, city_key=city_key)
+    try:
+        # a savepoint, so losing the race to a concurrent insert of the same
+        # area does not roll back the caller's transaction
+        with db.session.begin_nested():
+            db.session.add(area)
+    except IntegrityError:
+        area = Area.query.filter_by(state=state, city_key=city_key).one()
+    return area
+
+
+def place(entity, city, state):
+    # sets area_id and the normalized city/state on a Venue or Artist
+    area = area_for(city, state)
+    entity.area_id, entity.city, entity.state = area.id, area.city, area.state
+    return area
+
+
+def _area_id(connection, city, state, city_key):
+    # area_for() in Core, for backfill_areas()
+    areas = Area.__table__
+    find = select(areas.c.id).where(areas.c.state == state, areas.c.city_key == city_key)
+    area_id = connection.scalar(find)
+    if area_id is None:
+        try:
+            with connection.begin_nested():
+                area_id = connection.execute(areas.insert().values(
+                    city=city, state=state, city_key=city_key)).inserted_primary_key[0]
+        except IntegrityError:
+            area_id = connection.scalar(find)
+    return area_id
+
+
+def backfill_areas(connection):
+    # points every venue and artist without an area at one; one UPDATE per
+    # distinct typed city/state. Core on the given connection, so the areas
+    # migration can run it too. Safe to rerun. Returns rows updated.
+    updated = 0
+    for table in (Venue.__table__, Artist.__table__):
+        pairs = connection.execute(select(table.c.city, table.c.state)
+                                   .where(table.c.area_id.is_(None)).distinct()).all()
+        for city, state in pairs:
+            normalized = normalize_area(city, state)
+            if not normalized[0] or not normalized[1]:
+                continue
+            updated += connection.execute(table.update().where(
+                table.c.area_id.is_(None), table.c.city == city, table.c.state == state
+            ).values(area_id=_area_id(connection, *normalized), city=normalized[0],
+                     state=normalized[1], version_id=table.c.version_id + 1)).rowcount
+    return updated
+
+
+areas_cli = AppGroup('areas', help='Maintain the city/state areas.')
+
+
+@areas_cli.command('backfill')
+def backfill_command():
+    """Attach venues and artists that have no area to one (the areas migration already did once)."""
+    updated = backfill_areas(db.session.connection())
+    db.session.commit()
+    click.echo('Attached {} venues and artists to areas.'.format(updated))
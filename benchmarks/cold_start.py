@@ -0,0 +1,80 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import click
+
+# python -m benchmarks.cold_start --runs 5
+#
+# Boots the app in a fresh Python process per run, against the database
+# named by DATABASE_URL (seed it with benchmarks.seed), and times the import
+# of app.py (which precompiles the templates) and then the first request to
+# each --url, as the first visitors after a deploy would see them. A second
+# request to the first URL gives the warm figure for comparison.
+#
+# Each run is repeated for every bytecode cache setting:
+#   none        TEMPLATE_BYTECODE_CACHE unset: every boot compiles from source
+#   filesystem  a cache directory shared by the runs; the first run fills it
+
+URLS = ('/venues', '/artists', '/shows', '/venues/1', '/artists/1')
+
+CACHES = ('none', 'filesystem')
+
+
+def boot():
+    # runs in the child: one JSON line of timings in ms
+    started = time.perf_counter()
+    from app import app
+    timings = {'import': (time.perf_counter() - started) * 1000}
+    app.config['QUERY_STATS_HEADERS'] = False
+    client = app.test_client()
+    urls = json.loads(os.environ['COLD_START_URLS'])
+    for url in urls + urls[:1]:
+        started = time.perf_counter()
+        response = client.get(url)
+        elapsed = (time.perf_counter() - started) * 1000
+        if response.status_code != 200:
+            raise SystemExit('{}: HTTP {}'.format(url, response.status_code))
+        timings['warm ' + url if url in timings else url] = elapsed
+    print(json.dumps(timings))
+
+
+def run_child(urls, cache, cache_dir):
+    env = dict(os.environ, COLD_START_URLS=json.dumps(list(urls)),
+               TEMPLATE_BYTECODE_CACHE='' if cache == 'none' else cache,
+               TEMPLATE_BYTECODE_CACHE_DIR=cache_dir)
+    started = time.perf_counter()
+    result = subprocess.run([sys.executable, '-m', 'benchmarks.cold_start', '--child'],
+                            env=env, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise click.ClickException(result.stderr.strip().splitlines()[-1])
+    timings = json.loads(result.stdout.strip().splitlines()[-1])
+    timings['process'] = (time.perf_counter() - started) * 1000
+    return timings
+
+
+@click.command()
+@click.option('--runs', default=5, show_default=True, help='Fresh processes per cache setting.')
+@click.option('--url', 'urls', multiple=True, default=URLS, show_default=True,
+              help='Requested in order after boot; repeat the option for several.')
+@click.option('--child', is_flag=True, hidden=True)
+def main(runs, urls, child):
+    """Time app import and the first requests of a freshly started process."""
+    if child:
+        return boot()
+    click.echo('{:<11} {:<16} {:>8} {:>8} {:>8}'.format('cache', 'step', 'min ms', 'median', 'max ms'))
+    for cache in CACHES:
+        with tempfile.TemporaryDirectory(prefix='fyyur-bytecode-') as cache_dir:
+            samples = [run_child(urls, cache, cache_dir) for _ in range(runs)]
+        for step in samples[0]:
+            values = [s[step] for s in samples]
+            click.echo('{:<11} {:<16} {:>8.1f} {:>8.1f} {:>8.1f}'.format(
+                cache, step, min(values), statistics.median(values), max(values)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+from datetime import datetime, timedelta
+from itertools import accumulate
+
+from forms import GENRES
+
+# Synthetic catalog rows with roughly realistic shapes: venues and artists
+# cluster in big cities, a few genres dominate, and a few venues/artists get
+# most of the shows (Zipf-like weights).
+
+# (city, state, weight)
+CITIES = (
+    ('New York', 'NY', 20), ('Los Angeles', 'CA', 15), ('Chicago', 'IL', 10),
+    ('San Francisco', 'CA', 9), ('Austin', 'TX', 8), ('Nashville', 'TN', 8),
+    ('Seattle', 'WA', 6), ('Atlanta', 'GA', 5), ('New Orleans', 'LA', 5),
+    ('Denver', 'CO', 4), ('Boston', 'MA', 4), ('Portland', 'OR', 3),
+    ('Minneapolis', 'MN', 2), ('Detroit', 'MI', 2), ('Memphis', 'TN', 2),
+    ('Burlington', 'VT', 1), ('Boise', 'ID', 1), ('Santa Fe', 'NM', 1),
+)
+
+# rank-based weights: Rock n Roll and Pop are far more common than Classical
+GENRE_WEIGHTS = {genre: 1.0 / rank for rank, genre in enumerate(
+    ('Rock n Roll', 'Pop', 'Hip-Hop', 'Jazz', 'Alternative', 'R&B', 'Electronic',
+     'Country', 'Folk', 'Blues', 'Punk', 'Soul', 'Funk', 'Heavy Metal', 'Reggae',
+     'Instrumental', 'Musical Theatre', 'Classical', 'Other'), start=1)}
+assert set(GENRE_WEIGHTS) == set(GENRES)
+
+ADJECTIVES = ('Blue', 'Golden', 'Velvet', 'Electric', 'Silent', 'Wild', 'Midnight',
+              'Crimson', 'Lucky', 'Copper', 'Hollow', 'Neon', 'Rusty', 'Lonely', 'Royal')
+VENUE_NOUNS = ('Room', 'Hall', 'Lounge', 'Tavern', 'Ballroom', 'Club', 'Theatre',
+               'Warehouse', 'Garden', 'Cellar')
+ARTIST_NOUNS = ('Wolves', 'Petals', 'Echoes', 'Saints', 'Rivers', 'Machines',
+                'Sparrows', 'Kings', 'Ghosts', 'Strangers')
+STREETS = ('Main St', 'Mission St', 'Broadway', 'Elm St', 'Market St', '2nd Ave', 'Oak St')
+
+
+def city(rng):
+    name, state, _ = rng.choices(CITIES, weights=[c[2] for c in CITIES])[0]
+    return name, state
+
+
+def genres(rng):
+    picked = set(rng.choices(list(GENRE_WEIGHTS), weights=list(GENRE_WEIGHTS.values()),
+                             k=rng.choice((1, 1, 2, 2, 3))))
+    return sorted(picked)
+
+
+def phone(rng):
+    return '{}-{}-{}'.format(rng.randint(200, 999), rng.randint(200, 999), rng.randint(1000, 9999))
+
+
+def venue_record(rng, n):
+    name, state = city(rng)
+    return {
+        'name': 'The {} {} {}'.format(rng.choice(ADJECTIVES), rng.choice(VENUE_NOUNS), n),
+        'city': name,
+        'state': state,
+        'address': '{} {}'.format(rng.randint(1, 2000), rng.choice(STREETS)),
+        'phone': phone(rng),
+        'image_link': 'https://images.example.com/venues/{}.jpg'.format(n),
+        'facebook_link': 'https://www.facebook.com/venue{}'.format(n),
+        'website': 'https://venue{}.example.com'.format(n),
+        'seeking_talent': rng.random() < 0.3,
+        'seeking_description': 'Looking for local acts',
+        'genres': genres(rng),
+    }
+
+
+def artist_record(rng, n):
+    name, state = city(rng)
+    return {
+        'name': '{} {} {}'.format(rng.choice(ADJECTIVES), rng.choice(ARTIST_NOUNS), n),
+        'city': name,
+        'state': state,
+        'phone': phone(rng),
+        'image_link': 'https://images.example.com/artists/{}.jpg'.format(n),
+        'facebook_link': 'https://www.facebook.com/artist{}'.format(n),
+        'website': 'https://artist{}.example.com'.format(n),
+        'seeking_venue': rng.random() < 0.4,
+        'seeking_description': 'Available for weekend gigs',
+        'genres': genres(rng),
+    }
+
+
+def zipf_cum_weights(rng, n, s=1.1):
+    # cumulative, for rng.choices(cum_weights=...), with ranks shuffled so
+    # popularity does not follow id order
+    weights = [1.0 / (rank ** s) for rank in range(1, n + 1)]
+    rng.shuffle(weights)
+    return list(accumulate(weights))
+
+
+def show_records(rng, venue_ids, artist_ids, count, now=None):
+    """`count` shows from a year back to six months ahead, evening slots,
+    with at most one show per venue and start time."""
+    if count > len(venue_ids) * 546 * 5:
+        raise ValueError('not enough venue slots for {} shows'.format(count))
+    now = (now or datetime.now()).replace(minute=0, second=0, microsecond=0)
+    venue_weights = zipf_cum_weights(rng, len(venue_ids))
+    artist_weights = zipf_cum_weights(rng, len(artist_ids))
+    taken = set()
+    rows = []
+    while len(rows) < count:
+        venue_id = rng.choices(venue_ids, cum_weights=venue_weights)[0]
+        day = now.replace(hour=0) + timedelta(days=rng.randint(-365, 180))
+        start_time = day + timedelta(hours=rng.choice((18, 19, 20, 21, 22)))
+        if (venue_id, start_time) in taken:
+            continue
+        taken.add((venue_id, start_time))
+        rows.append({
+            'venue_id': venue_id,
+            'artist_id': rng.choices(artist_ids, cum_weights=artist_weights)[0],
+            'start_time': start_time,
+        })
+    return rows
+
+
+def form_data(record):
+    # a venue/artist record as the create/edit forms post it
+    data = {k: v for k, v in record.items() if k not in ('website', 'genres')}
+    data['website_link'] = record['website']
+    data['genres'] = record['genres']
+    for flag in ('seeking_talent', 'seeking_venue'):
+        # an unchecked checkbox is simply not posted
+        if flag in data:
+            if data[flag]:
+                data[flag] = 'y'
+            else:
+                del data[flag]
+    return data
@@ -0,0 +1,67 @@
+import random
+import time
+from datetime import datetime, timedelta
+
+import click
+
+import app as fyyur
+
+# python -m benchmarks.datetime_filter --rows 10000
+#
+# Per-row cost of `start_time|datetime('full')` in a template loop, the way
+# pages/shows.html renders a listing. No database is needed. Start times are
+# drawn from --distinct half-hour slots, so the memoized output is measured
+# with a realistic amount of repetition:
+#   first      the first render, with the formatted-output cache empty
+#   best       the fastest of --repeat renders, with the cache warm
+# "uncached" formats every row with Babel directly, without the filter's
+# caches, for reference.
+
+TEMPLATE = "{% for s in shows %}{{ s.start_time|datetime('full') }}{% endfor %}"
+
+
+def time_render(template, rows, repeat):
+    fyyur.formatted_datetime.cache_clear()
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        template.render(shows=rows)
+        timings.append(time.perf_counter() - started)
+    return timings[0], min(timings)
+
+
+def time_uncached(values):
+    started = time.perf_counter()
+    for value in values:
+        fyyur.formatted_datetime.__wrapped__(value, 'full', 'en')
+    return time.perf_counter() - started
+
+
+@click.command()
+@click.option('--rows', default=10000, show_default=True, help='Shows rendered per template.')
+@click.option('--distinct', default=17520, show_default=True,
+              help='Distinct start times the rows are drawn from (17520 is a year of half hours).')
+@click.option('--repeat', default=5, show_default=True)
+@click.option('--seed', default=42, show_default=True)
+def main(rows, distinct, repeat, seed):
+    """Time the datetime template filter over a listing of --rows shows."""
+    rng = random.Random(seed)
+    start = datetime(2026, 1, 1, 18, 0)
+    values = [start + timedelta(minutes=30 * rng.randrange(distinct)) for _ in range(rows)]
+    template = fyyur.app.jinja_env.from_string(TEMPLATE)
+
+    click.echo('{:<10} {:>12} {:>10} {:>12} {:>10}'.format(
+        'input', 'first us/row', 'first ms', 'best us/row', 'best ms'))
+    with fyyur.app.app_context():
+        # str values are what the pages passed before the filter took datetimes
+        for label, shows in (('datetime', [{'start_time': v} for v in values]),
+                             ('str', [{'start_time': str(v)} for v in values])):
+            first, best = time_render(template, shows, repeat)
+            click.echo('{:<10} {:>12.2f} {:>10.1f} {:>12.2f} {:>10.1f}'.format(
+                label, first / rows * 1e6, first * 1000, best / rows * 1e6, best * 1000))
+        uncached = time_uncached(values)
+        click.echo('{:<10} {:>12.2f} {:>10.1f}'.format('uncached', uncached / rows * 1e6, uncached * 1000))
+
+
+if __name__ == '__main__':
+    main()
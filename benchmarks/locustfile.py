@@ -0,0 +1,54 @@
+import random
+
+from locust import HttpUser, between, task
+
+# Load against a running server, over real HTTP:
+#
+#   locust -f benchmarks/locustfile.py --host http://127.0.0.1:5000
+#
+# Same mix as benchmarks.run, read-heavy. Ids are discovered through the
+# JSON API so any seeded database works. Locust runs this file on its own,
+# so it does not import the app.
+
+TERMS = ('blu', 'gol', 'vel', 'ele', 'wil', 'mid', 'roo', 'hal', 'wol', 'pet')
+
+
+class Visitor(HttpUser):
+    wait_time = between(0.5, 2)
+
+    def on_start(self):
+        self.venue_ids = [v['id'] for v in
+                          self.client.get('/api/v1/venues?fields=id&limit=200').json()['data']]
+        self.artist_ids = [a['id'] for a in
+                           self.client.get('/api/v1/artists?fields=id&limit=200').json()['data']]
+
+    @task(10)
+    def listings(self):
+        self.client.get(random.choice(('/venues', '/artists', '/shows')))
+
+    @task(15)
+    def venue_profile(self):
+        self.client.get('/venues/{}'.format(random.choice(self.venue_ids)), name='/venues/[id]')
+
+    @task(15)
+    def artist_profile(self):
+        self.client.get('/artists/{}'.format(random.choice(self.artist_ids)), name='/artists/[id]')
+
+    @task(6)
+    def search(self):
+        path = random.choice(('/venues/search', '/artists/search'))
+        self.client.post(path, data={'search_term': random.choice(TERMS)})
+
+    @task(6)
+    def lookup(self):
+        self.client.get('/api/lookup?kind=artist&q={}'.format(random.choice(TERMS)[:2]),
+                        name='/api/lookup')
+
+    @task(2)
+    def create_show(self):
+        self.client.post('/shows/create', data={
+            'venue_id': random.choice(self.venue_ids),
+            'artist_id': random.choice(self.artist_ids),
+            'start_time': '2030-{:02d}-{:02d} {:02d}:00:00'.format(
+                random.randint(1, 12), random.randint(1, 28), random.randint(0, 23)),
+        })
@@ -0,0 +1,275 @@
+import json
+import os
+import random
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+import click
+
+from app import app
+from metrics import count_queries
+from model import db, Venue, Artist
+
+from benchmarks import data
+
+# python -m benchmarks.run --threads 8 --duration 20 --compare baseline
+#
+# Drives the app's routes in-process through the Flask test client from
+# several threads, against the database named by DATABASE_URL (seed it with
+# benchmarks.seed). Reports req/s, latency percentiles and SQL statements
+# per request for each scenario, can save the numbers as a baseline, and
+# exits non-zero when a run regresses against one.
+
+BASELINE_DIR = os.path.join(os.path.dirname(__file__), 'baselines')
+
+# fewest requests a scenario needs before its p95 is compared
+MIN_SAMPLES = 50
+
+
+#  Scenarios
+#  ----------------------------------------------------------------
+# Each scenario picks a request: (method, url, keyword arguments for
+# client.open). Weights give a read-heavy mix.
+
+def listing(path):
+    return lambda rng, ids: ('GET', path, {})
+
+
+def venue_profile(rng, ids):
+    return 'GET', '/venues/{}'.format(rng.choice(ids['venues'])), {}
+
+
+def artist_profile(rng, ids):
+    return 'GET', '/artists/{}'.format(rng.choice(ids['artists'])), {}
+
+
+def search(path):
+    def pick(rng, ids):
+        term = rng.choice(data.ADJECTIVES + data.VENUE_NOUNS + data.ARTIST_NOUNS)[:rng.randint(2, 5)]
+        return 'POST', path, {'data': {'search_term': term}}
+    return pick
+
+
+def lookup(rng, ids):
+    term = rng.choice(data.ADJECTIVES)[:rng.randint(1, 4)]
+    return 'GET', '/api/lookup?kind={}&q={}'.format(rng.choice(('artist', 'venue')), term), {}
+
+
+def create_show(rng, ids):
+    start_time = datetime.now() + timedelta(days=rng.randint(1, 365), hours=rng.randint(0, 23))
+    return 'POST', '/shows/create', {'data': {
+        'venue_id': rng.choice(ids['venues']),
+        'artist_id': rng.choice(ids['artists']),
+        'start_time': start_time.strftime('%Y-%m-%d %H:00:00'),
+    }}
+
+
+def create_venue(rng, ids):
+    return 'POST', '/venues/create', {'data': data.form_data(data.venue_record(rng, rng.randint(1, 10 ** 6)))}
+
+
+def create_artist(rng, ids):
+    return 'POST', '/artists/create', {'data': data.form_data(data.artist_record(rng, rng.randint(1, 10 ** 6)))}
+
+
+def edit_venue_form(rng, ids):
+    return 'GET', '/venues/{}/edit'.format(rng.choice(ids['venues'])), {}
+
+
+def edit_artist_form(rng, ids):
+    return 'GET', '/artists/{}/edit'.format(rng.choice(ids['artists'])), {}
+
+
+def edit_venue(rng, ids):
+    venue_id = rng.choice(ids['venues'])
+    return 'POST', '/venues/{}/edit'.format(venue_id), {
+        'data': data.form_data(data.venue_record(rng, venue_id))}
+
+
+def edit_artist(rng, ids):
+    artist_id = rng.choice(ids['artists'])
+    return 'POST', '/artists/{}/edit'.format(artist_id), {
+        'data': data.form_data(data.artist_record(rng, artist_id))}
+
+
+# name -> (weight, request picker)
+SCENARIOS = {
+    'home': (2, listing('/')),
+    'venues': (10, listing('/venues')),
+    'artists': (10, listing('/artists')),
+    'shows': (10, listing('/shows')),
+    'venue_profile': (15, venue_profile),
+    'artist_profile': (15, artist_profile),
+    'search_venues': (6, search('/venues/search')),
+    'search_artists': (6, search('/artists/search')),
+    'api_venues': (4, listing('/api/v1/venues')),
+    'api_shows': (4, listing('/api/v1/shows')),
+    'api_lookup': (6, lookup),
+    'show_form': (2, listing('/shows/create')),
+    'create_show': (3, create_show),
+    'create_venue': (1, create_venue),
+    'create_artist': (1, create_artist),
+    'edit_venue_form': (1, edit_venue_form),
+    'edit_artist_form': (1, edit_artist_form),
+    'edit_venue': (1, edit_venue),
+    'edit_artist': (1, edit_artist),
+}
+
+
+#  Runner
+#  ----------------------------------------------------------------
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))]
+
+
+def summarize(rows, wall):
+    # rows of (seconds, statements, ok)
+    latencies = [r[0] * 1000 for r in rows]
+    return {
+        'requests': len(rows),
+        'errors': sum(1 for r in rows if not r[2]),
+        'rps': len(rows) / wall,
+        'p50_ms': percentile(latencies, 50),
+        'p95_ms': percentile(latencies, 95),
+        'p99_ms': percentile(latencies, 99),
+        'queries': sum(r[1] for r in rows) / float(len(rows)),
+    }
+
+
+def catalog_ids(sample=1000):
+    with app.app_context():
+        ids = {
+            'venues': [v.id for v in db.session.query(Venue.id).order_by(Venue.id).limit(sample)],
+            'artists': [a.id for a in db.session.query(Artist.id).order_by(Artist.id).limit(sample)],
+        }
+    if not ids['venues'] or not ids['artists']:
+        raise click.ClickException('The database is empty; run python -m benchmarks.seed first.')
+    return ids
+
+
+def worker(names, weights, ids, deadline, seed, samples, lock):
+    rng = random.Random(seed)
+    client = app.test_client()
+    local = defaultdict(list)
+    while time.perf_counter() < deadline:
+        name = rng.choices(names, cum_weights=weights)[0]
+        method, url, kwargs = SCENARIOS[name][1](rng, ids)
+        started = time.perf_counter()
+        with count_queries() as stats:
+            response = client.open(url, method=method, **kwargs)
+        elapsed = time.perf_counter() - started
+        local[name].append((elapsed, stats.count, response.status_code < 500))
+    with lock:
+        for name, rows in local.items():
+            samples[name].extend(rows)
+
+
+def run(scenarios, threads, duration, seed):
+    ids = catalog_ids()
+    names = list(scenarios)
+    weights = []
+    for name in names:
+        weights.append((weights[-1] if weights else 0) + SCENARIOS[name][0])
+
+    # one pass over every scenario first: template compilation, connection
+    # pool and caches should not count against the first requests measured
+    warm_rng = random.Random(seed)
+    client = app.test_client()
+    for name in names:
+        method, url, kwargs = SCENARIOS[name][1](warm_rng, ids)
+        client.open(url, method=method, **kwargs)
+
+    samples = defaultdict(list)
+    lock = threading.Lock()
+    started = time.perf_counter()
+    deadline = started + duration
+    pool = [threading.Thread(target=worker, args=(names, weights, ids, deadline, seed + i, samples, lock))
+            for i in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    wall = time.perf_counter() - started
+
+    results = {name: summarize(samples[name], wall) for name in names if samples.get(name)}
+    results['TOTAL'] = summarize([r for rows in samples.values() for r in rows], wall)
+    return results
+
+
+def report(results):
+    click.echo('{:<18} {:>7} {:>5} {:>8} {:>8} {:>8} {:>8} {:>7}'.format(
+        'scenario', 'reqs', 'err', 'req/s', 'p50 ms', 'p95 ms', 'p99 ms', 'q/req'))
+    for name, r in results.items():
+        click.echo('{:<18} {:>7} {:>5} {:>8.1f} {:>8.1f} {:>8.1f} {:>8.1f} {:>7.2f}'.format(
+            name, r['requests'], r['errors'], r['rps'], r['p50_ms'], r['p95_ms'], r['p99_ms'],
+            r['queries']))
+
+
+def regressions(results, baseline, tolerance):
+    """Slower p95, lower throughput (beyond `tolerance`) or more queries per
+    request than the baseline; new errors always count."""
+    found = []
+    for name, base in baseline.items():
+        current = results.get(name)
+        if current is None:
+            continue
+        # a p95 from a handful of requests is noise
+        enough = min(current['requests'], base['requests']) >= MIN_SAMPLES
+        if enough and current['p95_ms'] > base['p95_ms'] * (1 + tolerance):
+            found.append('{}: p95 {:.1f} ms, baseline {:.1f} ms'.format(name, current['p95_ms'], base['p95_ms']))
+        if name == 'TOTAL' and current['rps'] < base['rps'] * (1 - tolerance):
+            found.append('{}: {:.1f} req/s, baseline {:.1f}'.format(name, current['rps'], base['rps']))
+        # query counts are deterministic per route; allow a little for the
+        # random mix of ids
+        if current['queries'] > base['queries'] * 1.1 + 0.1:
+            found.append('{}: {:.2f} queries/request, baseline {:.2f}'.format(
+                name, current['queries'], base['queries']))
+        if current['errors'] and not base['errors']:
+            found.append('{}: {} errors'.format(name, current['errors']))
+    return found
+
+
+@click.command()
+@click.option('--threads', default=8, show_default=True)
+@click.option('--duration', default=20.0, show_default=True, help='Seconds of measured load.')
+@click.option('--scenario', 'only', multiple=True, type=click.Choice(sorted(SCENARIOS)),
+              help='Run only these scenarios (repeatable).')
+@click.option('--seed', default=1, show_default=True)
+@click.option('--save-baseline', 'save_name', help='Save the results as baselines/NAME.json.')
+@click.option('--compare', 'compare_name', help='Fail when worse than baselines/NAME.json.')
+@click.option('--tolerance', default=0.2, show_default=True,
+              help='Allowed p95/throughput regression as a fraction.')
+def main(threads, duration, only, seed, save_name, compare_name, tolerance):
+    """Load the app's routes and report throughput, latency and queries."""
+    app.config['WTF_CSRF_ENABLED'] = False
+    app.config['QUERY_STATS_HEADERS'] = False
+    scenarios = only or list(SCENARIOS)
+    click.echo('{} threads, {:.0f}s, {} scenarios'.format(threads, duration, len(scenarios)))
+    results = run(scenarios, threads, duration, seed)
+    report(results)
+
+    if save_name:
+        os.makedirs(BASELINE_DIR, exist_ok=True)
+        path = os.path.join(BASELINE_DIR, save_name + '.json')
+        with open(path, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        click.echo('Saved baseline {}'.format(path))
+
+    if compare_name:
+        with open(os.path.join(BASELINE_DIR, compare_name + '.json')) as f:
+            baseline = json.load(f)
+        found = regressions(results, baseline, tolerance)
+        if found:
+            click.echo('Regressions against {}:'.format(compare_name))
+            for line in found:
+                click.echo('  ' + line)
+            raise SystemExit(1)
+        click.echo('No regressions against {}.'.format(compare_name))
+
+
+if __name__ == '__main__':
+    main()
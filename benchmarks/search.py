@@ -0,0 +1,116 @@
+import random
+import time
+from itertools import islice
+
+import click
+
+from app import app
+from model import db, Venue, Artist
+from queries import name_search
+
+from benchmarks import data
+from benchmarks.run import percentile
+from benchmarks.seed import CHUNK, insert_chunked
+
+# python -m benchmarks.search --sizes 1000,10000,100000,1000000
+#
+# Grows Venue and Artist to each size in turn, against the database named by
+# DATABASE_URL, and times /venues/search and /artists/search at each size.
+# Exits 1 when a p95 at the largest size is more than --max-growth times the
+# p95 at the smallest.
+#
+# Terms match a fixed handful of rows at every size, so the timings measure
+# finding the matches rather than rendering a growing result list:
+#   selective  the full name of an existing row (a few matches)
+#   miss       a made-up name (no matches)
+# Latency only stays flat where the trigram indexes exist, i.e. on Postgres
+# with pg_trgm; on SQLite every search is a table scan.
+
+SEARCHES = (('/venues/search', Venue, data.venue_record),
+            ('/artists/search', Artist, data.artist_record))
+
+
+def grow(model, make_record, rng, size):
+    # appends synthetic rows until the table holds `size`; generated a chunk
+    # at a time so a million rows never sit in memory at once
+    have = db.session.query(db.func.count(model.id)).scalar()
+    first = (db.session.query(db.func.max(model.id)).scalar() or 0) + 1
+    records = (make_record(rng, first + i) for i in range(max(size - have, 0)))
+    while True:
+        chunk = list(islice(records, CHUNK))
+        if not chunk:
+            break
+        insert_chunked(model.__table__, chunk)
+        db.session.commit()
+
+
+def search_terms(model, rng, count):
+    names = [r.name for r in db.session.query(model.name).order_by(db.func.random()).limit(count)]
+    return {
+        'selective': names,
+        'miss': ['Qzx {} Vrk'.format(rng.randint(10 ** 5, 10 ** 6)) for _ in range(count)],
+    }
+
+
+def matches(model, term):
+    match, ranking = name_search(model.name, term)
+    return db.session.query(db.func.count(model.id)).filter(match).scalar()
+
+
+def time_searches(client, path, terms, requests):
+    latencies = []
+    for i in range(requests):
+        term = terms[i % len(terms)]
+        started = time.perf_counter()
+        response = client.post(path, data={'search_term': term})
+        latencies.append((time.perf_counter() - started) * 1000)
+        if response.status_code != 200:
+            raise click.ClickException('{} {!r}: HTTP {}'.format(path, term, response.status_code))
+    return percentile(latencies, 50), percentile(latencies, 95)
+
+
+@click.command()
+@click.option('--sizes', default='1000,10000,100000,1000000', show_default=True,
+              help='Comma-separated row counts for Venue and Artist, ascending.')
+@click.option('--requests', default=200, show_default=True, help='Searches per route, term kind and size.')
+@click.option('--seed', default=42, show_default=True)
+@click.option('--max-growth', default=3.0, show_default=True,
+              help='Allowed ratio of p95 at the largest size to p95 at the smallest.')
+def main(sizes, requests, seed, max_growth):
+    """Time name search as the catalog grows from the smallest to the largest size."""
+    sizes = sorted(int(s) for s in sizes.split(','))
+    rng = random.Random(seed)
+    app.config['WTF_CSRF_ENABLED'] = False
+    app.config['QUERY_STATS_HEADERS'] = False
+    client = app.test_client()
+    p95s = {}
+
+    click.echo('{:>9} {:<16} {:<10} {:>8} {:>8} {:>8}'.format(
+        'rows', 'route', 'terms', 'matches', 'p50 ms', 'p95 ms'))
+    with app.app_context():
+        db.create_all()
+        for size in sizes:
+            for path, model, make_record in SEARCHES:
+                grow(model, make_record, rng, size)
+            db.session.execute(db.text('ANALYZE'))
+            db.session.commit()
+            for path, model, make_record in SEARCHES:
+                for kind, terms in search_terms(model, rng, 20).items():
+                    found = sum(matches(model, t) for t in terms) / float(len(terms))
+                    time_searches(client, path, terms, 10)  # warm up
+                    p50, p95 = time_searches(client, path, terms, requests)
+                    p95s.setdefault((path, kind), []).append(p95)
+                    click.echo('{:>9} {:<16} {:<10} {:>8.1f} {:>8.2f} {:>8.2f}'.format(
+                        size, path, kind, found, p50, p95))
+
+    growth = {key: values[-1] / values[0] for key, values in p95s.items()}
+    too_slow = {key: ratio for key, ratio in growth.items() if ratio > max_growth}
+    for (path, kind), ratio in sorted(growth.items()):
+        click.echo('{} {}: p95 x{:.2f} from {} to {} rows'.format(path, kind, ratio, sizes[0], sizes[-1]))
+    if too_slow:
+        click.echo('Search latency grows with the table (limit x{:.1f}).'.format(max_growth))
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
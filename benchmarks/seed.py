@@ -0,0 +1,59 @@
+import random
+import time
+
+import click
+
+from app import app
+from areas import backfill_areas
+from counters import refresh_counters
+from model import db, Venue, Artist, Show
+
+from benchmarks import data
+
+# python -m benchmarks.seed --venues 1000 --artists 2000 --shows 20000
+#
+# Fills the database named by DATABASE_URL with a synthetic catalog. Use a
+# throwaway database: --reset drops every table first.
+
+CHUNK = 1000
+
+
+def insert_chunked(table, rows):
+    for start in range(0, len(rows), CHUNK):
+        db.session.execute(table.insert(), rows[start:start + CHUNK])
+
+
+@click.command()
+@click.option('--venues', default=1000, show_default=True)
+@click.option('--artists', default=2000, show_default=True)
+@click.option('--shows', default=20000, show_default=True)
+@click.option('--seed', default=42, show_default=True, help='Random seed, for repeatable data.')
+@click.option('--reset', is_flag=True, help='Drop and recreate all tables first.')
+def seed(venues, artists, shows, seed, reset):
+    """Seed a benchmark database with venues, artists and shows."""
+    rng = random.Random(seed)
+    started = time.perf_counter()
+    with app.app_context():
+        click.echo('Seeding {}'.format(db.engine.url.render_as_string(hide_password=True)))
+        if reset:
+            db.drop_all()
+        db.create_all()
+
+        first_venue = (db.session.query(db.func.max(Venue.id)).scalar() or 0) + 1
+        first_artist = (db.session.query(db.func.max(Artist.id)).scalar() or 0) + 1
+        insert_chunked(Venue.__table__,
+                       [data.venue_record(rng, first_venue + i) for i in range(venues)])
+        insert_chunked(Artist.__table__,
+                       [data.artist_record(rng, first_artist + i) for i in range(artists)])
+        backfill_areas(db.session.connection())
+        venue_ids = [v.id for v in db.session.query(Venue.id)]
+        artist_ids = [a.id for a in db.session.query(Artist.id)]
+        insert_chunked(Show.__table__, data.show_records(rng, venue_ids, artist_ids, shows))
+        refresh_counters()
+        db.session.commit()
+    click.echo('Inserted {} venues, {} artists, {} shows in {:.1f}s'.format(
+        venues, artists, shows, time.perf_counter() - started))
+
+
+if __name__ == '__main__':
+    seed()
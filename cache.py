@@ -0,0 +1,137 @@
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+
+class LRUCache(object):
+    """In-process cache with least-recently-used eviction and a per-entry TTL.
+
+    Each gunicorn worker keeps its own copy, so invalidation only reaches the
+    worker that handled the write; use RedisCache when several workers serve
+    the same data.
+    """
+
+    def __init__(self, max_entries=1024, default_timeout=300):
+        self.max_entries = max_entries
+        self.default_timeout = default_timeout
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def set(self, key, value, timeout=None):
+        expires = time.monotonic() + (timeout or self.default_timeout)
+        with self._lock:
+            self._entries[key] = (expires, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete_many(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        return {'type': 'lru', 'hits': self.hits, 'misses': self.misses,
+                'size': len(self._entries), 'max_entries': self.max_entries}
+
+
+class RedisCache(object):
+    """Cache shared by all workers, stored in Redis (or anything speaking its
+    protocol). Values are pickled; hit/miss counters are per process."""
+
+    def __init__(self, url, default_timeout=300, key_prefix='fyyur:'):
+        import redis  # optional dependency, only needed for CACHE_TYPE = 'redis'
+        self.client = redis.Redis.from_url(url)
+        self.default_timeout = default_timeout
+        self.key_prefix = key_prefix
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        raw = self.client.get(self.key_prefix + key)
+        if raw is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return pickle.loads(raw)
+
+    def set(self, key, value, timeout=None):
+        self.client.set(self.key_prefix + key, pickle.dumps(value),
+                        ex=timeout or self.default_timeout)
+
+    def delete_many(self, *keys):
+        if keys:
+            self.client.delete(*[self.key_prefix + key for key in keys])
+
+    def clear(self):
+        keys = list(self.client.scan_iter(self.key_prefix + '*'))
+        if keys:
+            self.client.delete(*keys)
+
+    def stats(self):
+        return {'type': 'redis', 'hits': self.hits, 'misses': self.misses}
+
+
+class NullCache(object):
+    """Caches nothing; every lookup is a miss."""
+
+    def __init__(self):
+        self.misses = 0
+
+    def get(self, key):
+        self.misses += 1
+        return None
+
+    def set(self, key, value, timeout=None):
+        pass
+
+    def delete_many(self, *keys):
+        pass
+
+    def clear(self):
+        pass
+
+    def stats(self):
+        return {'type': 'null', 'hits': 0, 'misses': self.misses}
+
+
+def get_or_set(cache, key, build, timeout=None):
+    # read-through: build and store the value only on a miss
+    value = cache.get(key)
+    if value is None:
+        value = build()
+        cache.set(key, value, timeout)
+    return value
+
+
+def make_cache(config, max_entries=None, key_prefix='fyyur:'):
+    # max_entries/key_prefix let a second cache of the same CACHE_TYPE keep
+    # its entries apart (see the lookup cache in app.py)
+    cache_type = config.get('CACHE_TYPE', 'lru')
+    timeout = config.get('CACHE_DEFAULT_TIMEOUT', 300)
+    if cache_type == 'lru':
+        return LRUCache(max_entries or config.get('CACHE_MAX_ENTRIES', 1024), timeout)
+    if cache_type == 'redis':
+        return RedisCache(config['CACHE_REDIS_URL'], timeout, key_prefix)
+    if cache_type == 'null':
+        return NullCache()
+    raise ValueError('unknown CACHE_TYPE: {!r}'.format(cache_type))
@@ -0,0 +1,125 @@
+from datetime import datetime, timedelta
+
+import click
+from flask.cli import AppGroup
+from sqlalchemy import select
+
+from model import db, Venue, Artist, Show
+
+# Venue/Artist.upcoming_shows_count and past_shows_count are denormalized
+# copies of COUNTs over Shows. New shows bump them in the inserting
+# transaction; `flask counters roll` moves shows that have started since the
+# last run from upcoming to past, and `rebuild`/`verify` repair or report drift.
+
+# (entity model, foreign key on Shows) for every entity carrying counters
+COUNTED = ((Venue, Show.venue_id), (Artist, Show.artist_id))
+
+
+def count_new_show(venue_id, artist_id, start_time, now=None):
+    # called in the same transaction as the INSERT of the show
+    now = now or datetime.now()
+    for model, entity_id in ((Venue, venue_id), (Artist, artist_id)):
+        column = model.upcoming_shows_count if start_time > now else model.past_shows_count
+        db.session.query(model).filter(model.id == entity_id) \
+            .update({column: column + 1}, synchronize_session=False)
+
+
+def _actual_counts(model, fk_column, now):
+    upcoming = select(db.func.count(Show.id)) \
+        .where(fk_column == model.id, Show.start_time > now).scalar_subquery()
+    past = select(db.func.count(Show.id)) \
+        .where(fk_column == model.id, Show.start_time <= now).scalar_subquery()
+    return upcoming, past
+
+
+def refresh_counters(venue_ids=None, artist_ids=None, now=None):
+    """Recompute the counters of the given venues/artists (all when None) with
+    one set-based UPDATE per table. Idempotent, so overlapping runs are safe.
+
+    Only rows whose counters are wrong are written: an UPDATE also moves
+    updated_at, which would otherwise report every row to /api/changes,
+    incremental exports and the listing ETags. Returns the rows changed.
+    """
+    now = now or datetime.now()
+    changed = 0
+    for (model, fk_column), ids in zip(COUNTED, (venue_ids, artist_ids)):
+        if ids is not None and not ids:
+            continue
+        upcoming, past = _actual_counts(model, fk_column, now)
+        query = db.session.query(model).filter(
+            (model.upcoming_shows_count != upcoming) | (model.past_shows_count != past))
+        if ids is not None:
+            query = query.filter(model.id.in_(ids))
+        changed += query.update({model.upcoming_shows_count: upcoming,
+                                 model.past_shows_count: past}, synchronize_session=False)
+    return changed
+
+
+def roll_counters(since, now=None):
+    # only entities with a show that started in (since, now] can have moved
+    now = now or datetime.now()
+    started = db.session.query(Show.venue_id, Show.artist_id) \
+        .filter(Show.start_time > since, Show.start_time <= now).all()
+    venue_ids = {s.venue_id for s in started}
+    artist_ids = {s.artist_id for s in started}
+    refresh_counters(venue_ids, artist_ids, now)
+    return len(venue_ids), len(artist_ids)
+
+
+def find_drift(now=None):
+    # [(table, id, stored (upcoming, past), actual (upcoming, past))]
+    now = now or datetime.now()
+    drift = []
+    for model, fk_column in COUNTED:
+        upcoming, past = _actual_counts(model, fk_column, now)
+        rows = db.session.query(
+            model.id, model.upcoming_shows_count, model.past_shows_count,
+            upcoming.label('actual_upcoming'), past.label('actual_past')
+        ).filter((model.upcoming_shows_count != upcoming) |
+                 (model.past_shows_count != past))
+        for r in rows:
+            drift.append((model.__tablename__, r.id,
+                          (r.upcoming_shows_count, r.past_shows_count),
+                          (r.actual_upcoming, r.actual_past)))
+    return drift
+
+
+counters_cli = AppGroup('counters', help='Maintain the denormalized show counters.')
+
+
+@counters_cli.command('rebuild')
+def rebuild_command():
+    """Recompute every venue and artist counter from Shows."""
+    changed = refresh_counters()
+    db.session.commit()
+    click.echo('Show counters rebuilt; {} venues and artists changed.'.format(changed))
+
+
+@counters_cli.command('roll')
+@click.option('--minutes', default=60, show_default=True,
+              help='Look back this far for shows that have started.')
+def roll_command(minutes):
+    """Move shows that started recently from upcoming to past (run from cron)."""
+    venues, artists = roll_counters(datetime.now() - timedelta(minutes=minutes))
+    db.session.commit()
+    click.echo('Rolled counters of {} venues and {} artists.'.format(venues, artists))
+
+
+@counters_cli.command('verify')
+@click.option('--fix', is_flag=True, help='Rebuild the counters that drifted.')
+def verify_command(fix):
+    """Report counters that disagree with Shows; exits 1 on drift."""
+    drift = find_drift()
+    for table, entity_id, stored, actual in drift:
+        click.echo('{} {}: stored upcoming/past {}/{}, actual {}/{}'.format(
+            table, entity_id, stored[0], stored[1], actual[0], actual[1]))
+    if not drift:
+        click.echo('No drift.')
+        return
+    if fix:
+        refresh_counters([i for t, i, s, a in drift if t == Venue.__tablename__],
+                         [i for t, i, s, a in drift if t == Artist.__tablename__])
+        db.session.commit()
+        click.echo('Fixed {} counters.'.format(len(drift)))
+    else:
+        raise SystemExit(1)
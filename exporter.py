@@ -0,0 +1,154 @@
+import csv
+import hmac
+import io
+import json
+import sys
+import zlib
+from datetime import datetime
+
+import click
+import dateutil.parser
+from flask import Blueprint, Response, abort, current_app, request, stream_with_context
+from flask.cli import with_appcontext
+from sqlalchemy import select
+
+from model import db, Venue, Artist, Show
+from queries import settled_before
+
+# Catalog dumps for the warehouse. Rows are read through a server-side cursor
+# (stream_results) in batches of EXPORT_BATCH_SIZE and encoded batch by batch,
+# so memory stays flat however large the table is. --since/?since= exports
+# only rows changed after a watermark; the largest updated_at exported is the
+# next run's watermark. Rows changed in the last CHANGES_SETTLE_SECONDS are
+# left for the next run (see queries.settled_before).
+
+TABLES = {
+    'venues': Venue.__table__,
+    'artists': Artist.__table__,
+    'shows': Show.__table__,
+}
+
+# column compared against the incremental watermark, per table
+CHANGE_COLUMNS = {
+    'venues': Venue.__table__.c.updated_at,
+    'artists': Artist.__table__.c.updated_at,
+    'shows': Show.__table__.c.updated_at,
+}
+
+BATCH_SIZE = 1000
+
+
+def export_batches(kind, since=None, batch_size=BATCH_SIZE):
+    # yields lists of row mappings, in primary key order
+    table = TABLES[kind]
+    stmt = select(table).where(CHANGE_COLUMNS[kind] < settled_before()).order_by(table.c.id)
+    if since is not None:
+        stmt = stmt.where(CHANGE_COLUMNS[kind] > since)
+    result = db.session.execute(stmt.execution_options(stream_results=True))
+    for batch in result.yield_per(batch_size).mappings().partitions():
+        yield batch
+
+
+def cell(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, list):
+        # same ';' convention `flask import` reads back
+        return ';'.join(value)
+    return value
+
+
+def encode_csv(kind, batches):
+    columns = [c.name for c in TABLES[kind].columns]
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for batch in batches:
+        for row in batch:
+            writer.writerow([cell(row[c]) for c in columns])
+        yield buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+
+
+def encode_ndjson(kind, batches):
+    for batch in batches:
+        yield ''.join(json.dumps(dict(row), default=cell) + '\n' for row in batch).encode('utf-8')
+
+
+def gzipped(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+ENCODERS = {'csv': encode_csv, 'ndjson': encode_ndjson}
+
+
+def export_stream(kind, file_format='ndjson', compress=False, since=None):
+    batches = export_batches(kind, since, current_app.config.get('EXPORT_BATCH_SIZE', BATCH_SIZE))
+    chunks = ENCODERS[file_format](kind, batches)
+    return gzipped(chunks) if compress else chunks
+
+
+#  CLI
+#  ----------------------------------------------------------------
+
+@click.command('export')
+@click.argument('kind', type=click.Choice(sorted(TABLES)))
+@click.option('--format', 'file_format', type=click.Choice(sorted(ENCODERS)),
+              default='ndjson', show_default=True)
+@click.option('--gzip', 'compress', is_flag=True, help='gzip the output.')
+@click.option('--since', help='Only rows changed after this timestamp.')
+@click.option('-o', '--output', type=click.Path(dir_okay=False),
+              help='Write to this file instead of stdout.')
+@with_appcontext
+def export_command(kind, file_format, compress, since, output):
+    """Stream a table as CSV or NDJSON."""
+    since = dateutil.parser.parse(since) if since else None
+    out = open(output, 'wb') if output else sys.stdout.buffer
+    try:
+        for chunk in export_stream(kind, file_format, compress, since):
+            out.write(chunk)
+    finally:
+        if output:
+            out.close()
+
+
+#  HTTP
+#  ----------------------------------------------------------------
+
+exports = Blueprint('exports', __name__)
+
+CONTENT_TYPES = {'csv': 'text/csv', 'ndjson': 'application/x-ndjson'}
+
+
+@exports.route('/export/<kind>')
+def export(kind):
+    # bearer token from EXPORT_TOKEN; the endpoint does not exist without one
+    token = current_app.config.get('EXPORT_TOKEN')
+    if not token or kind not in TABLES:
+        abort(404)
+    supplied = request.headers.get('Authorization', '')
+    if not hmac.compare_digest(supplied.encode('utf-8'), 'Bearer {}'.format(token).encode('utf-8')):
+        abort(401)
+
+    file_format = request.args.get('format', 'ndjson')
+    if file_format not in ENCODERS:
+        abort(400)
+    compress = request.args.get('gzip') in ('1', 'true')
+    since = request.args.get('since')
+    try:
+        since = dateutil.parser.parse(since) if since else None
+    except (ValueError, OverflowError):
+        abort(400)
+
+    filename = '{}.{}{}'.format(kind, file_format, '.gz' if compress else '')
+    return Response(stream_with_context(export_stream(kind, file_format, compress, since)),
+                    mimetype='application/gzip' if compress else CONTENT_TYPES[file_format],
+                    headers={'Content-Disposition': 'attachment; filename={}'.format(filename)})
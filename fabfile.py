@@ -13,6 +13,11 @@ def test():
         abort("Aborted at user request.")
 
 
+def bench(baseline="baseline"):
+    # fails when the app regressed against benchmarks/baselines/<baseline>.json
+    local("python -m benchmarks.run --compare {}".format(baseline))
+
+
 def commit():
     message = raw_input("Enter a git commit message: ")
     local("git add . && git commit -am '{}'".format(message))
@@ -0,0 +1,146 @@
+import hashlib
+import os
+import time
+from functools import wraps
+
+from flask import current_app, g, make_response, request, session
+from sqlalchemy import select
+
+from model import db
+
+# HTTP caching for the public HTML pages and static files.
+#
+# Pages: each view is wrapped with @cached_page(policy, version). `version`
+# is a cheap query for what the page depends on (row counts and the latest
+# updated_at, or a profile's row versions); its weak ETag is checked before
+# the view runs, so a matching If-None-Match is answered 304 without
+# rendering. Responses that carry flashed messages are never cached.
+#
+# Static files: url_for('static', ...) adds ?v=<content hash>, and requests
+# carrying the current hash are served as immutable for a year.
+
+
+def table_version(*models):
+    # count and latest updated_at of each table, in one round trip; the count
+    # catches deletes, which do not move max(updated_at). Read once per
+    # request (init_http_cache resets it), so the view can reuse what its
+    # ETag was computed from
+    versions = g.setdefault('table_versions', {})
+    if models not in versions:
+        columns = []
+        for model in models:
+            columns.append(select(db.func.count(model.id)).scalar_subquery())
+            columns.append(select(db.func.max(model.updated_at)).scalar_subquery())
+        versions[models] = tuple(db.session.execute(select(*columns)).one())
+    return versions[models]
+
+
+def site_version(app):
+    # changes whenever a template or static file is deployed
+    version = app.extensions.get('site_version')
+    if version is None:
+        digest = hashlib.sha1()
+        for folder in (app.template_folder, app.static_folder):
+            root = os.path.join(app.root_path, folder)
+            for dirpath, dirnames, filenames in os.walk(root):
+                dirnames.sort()
+                for name in sorted(filenames):
+                    path = os.path.join(dirpath, name)
+                    stat = os.stat(path)
+                    digest.update('{}:{}:{}'.format(os.path.relpath(path, root), stat.st_size,
+                                                    int(stat.st_mtime)).encode('utf-8'))
+        version = app.extensions['site_version'] = digest.hexdigest()[:12]
+    return version
+
+
+def page_etag(version):
+    # pages that split shows into upcoming/past go stale as time passes, so
+    # the ETag also rolls over every HTTP_CACHE_VERSION_BUCKET seconds
+    bucket = int(time.time() // current_app.config['HTTP_CACHE_VERSION_BUCKET'])
+    parts = (site_version(current_app), request.full_path, version, bucket)
+    return hashlib.sha1(repr(parts).encode('utf-8')).hexdigest()
+
+
+def cached_page(policy, version=None):
+    """Cache-Control from HTTP_CACHE_POLICIES[policy] and a weak ETag.
+
+    With `version` (called with the view's arguments) the ETag is known
+    before rendering; without it the ETag is a hash of the rendered body,
+    which still spares the client the download.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if session.get('_flashes'):
+                # one-off content for this visitor only
+                response = make_response(view(*args, **kwargs))
+                response.cache_control.no_store = True
+                return response
+
+            cache_control = current_app.config['HTTP_CACHE_POLICIES'][policy]
+            etag = page_etag(version(*args, **kwargs)) if version is not None else None
+            if etag is not None and request.if_none_match.contains_weak(etag):
+                response = current_app.response_class(status=304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            if etag is not None:
+                response.set_etag(etag, weak=True)
+            else:
+                response.add_etag(weak=True)
+                response.make_conditional(request)
+            response.headers['Cache-Control'] = cache_control
+            return response
+        return wrapper
+    return decorator
+
+
+#  Static files
+#  ----------------------------------------------------------------
+
+_fingerprints = {}
+
+
+def static_fingerprint(app, filename):
+    # content hash, recomputed only when the file's mtime changes
+    path = os.path.join(app.static_folder, filename)
+    try:
+        mtime = os.stat(path).st_mtime
+    except OSError:
+        return None
+    cached = _fingerprints.get(path)
+    if cached is None or cached[0] != mtime:
+        with open(path, 'rb') as f:
+            cached = _fingerprints[path] = (mtime, hashlib.md5(f.read()).hexdigest()[:10])
+    return cached[1]
+
+
+def init_http_cache(app):
+    @app.before_request
+    def reset_table_versions():
+        # g outlives the request when an app context was already pushed
+        g.pop('table_versions', None)
+
+    @app.url_defaults
+    def fingerprint_static_urls(endpoint, values):
+        if endpoint == 'static' and 'filename' in values and 'v' not in values:
+            fingerprint = static_fingerprint(app, values['filename'])
+            if fingerprint:
+                values['v'] = fingerprint
+
+    static_view = app.view_functions['static']
+
+    @wraps(static_view)
+    def static(filename):
+        response = static_view(filename=filename)
+        version = request.args.get('v')
+        if version and version == static_fingerprint(app, filename):
+            # the URL changes with the content, so the response never does
+            response.cache_control.no_cache = None
+            response.cache_control.public = True
+            response.cache_control.max_age = 365 * 24 * 3600
+            response.cache_control.immutable = True
+        return response
+
+    app.view_functions['static'] = static
@@ -0,0 +1,223 @@
+import csv
+import json
+import os
+import time
+from itertools import islice
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from werkzeug.datastructures import MultiDict
+
+from areas import area_for
+from counters import refresh_counters
+from forms import VenueForm, ArtistForm, ShowForm
+from model import db, Venue, Artist, Show
+from queries import venue_cache_key, artist_cache_key
+from show_writer import SLOT_TAKEN, taken_slots
+
+# `flask import <kind> FILE` streams a CSV or NDJSON file in chunks, checks
+# every row with the same form the create page uses, and writes each chunk
+# with one executemany INSERT. Rows that fail go to a rejects file.
+
+BOOLEAN_FIELDS = ('seeking_talent', 'seeking_venue')
+TRUE_VALUES = ('1', 'true', 't', 'yes', 'y', 'on')
+
+
+def venue_row(form):
+    return {
+        'name': form.name.data,
+        'city': form.city.data,
+        'state': form.state.data,
+        'address': form.address.data,
+        'phone': form.phone.data,
+        'image_link': form.image_link.data,
+        'facebook_link': form.facebook_link.data,
+        'website': form.website_link.data,
+        'seeking_talent': form.seeking_talent.data,
+        'seeking_description': form.seeking_description.data,
+        'genres': form.genres.data,
+    }
+
+
+def artist_row(form):
+    return {
+        'name': form.name.data,
+        'city': form.city.data,
+        'state': form.state.data,
+        'phone': form.phone.data,
+        'image_link': form.image_link.data,
+        'facebook_link': form.facebook_link.data,
+        'website': form.website_link.data,
+        'seeking_venue': form.seeking_venue.data,
+        'seeking_description': form.seeking_description.data,
+        'genres': form.genres.data,
+    }
+
+
+def show_row(form):
+    return {
+        'venue_id': int(form.venue_id.data),
+        'artist_id': int(form.artist_id.data),
+        'start_time': form.start_time.data,
+    }
+
+
+# kind -> (form, table, form -> insert row)
+KINDS = {
+    'venues': (VenueForm, Venue.__table__, venue_row),
+    'artists': (ArtistForm, Artist.__table__, artist_row),
+    'shows': (ShowForm, Show.__table__, show_row),
+}
+
+
+def read_records(path, file_format):
+    # yields (line number, dict) without loading the file
+    with open(path, newline='', encoding='utf-8') as f:
+        if file_format == 'csv':
+            for number, record in enumerate(csv.DictReader(f), start=2):
+                # multi-valued cells (genres) are separated by ';'
+                if record.get('genres'):
+                    record['genres'] = [g.strip() for g in record['genres'].split(';') if g.strip()]
+                yield number, record
+        else:
+            for number, line in enumerate(f, start=1):
+                if line.strip():
+                    yield number, json.loads(line)
+
+
+def to_formdata(record):
+    formdata = MultiDict()
+    for name, value in record.items():
+        if value is None:
+            continue
+        if name in BOOLEAN_FIELDS:
+            # BooleanField only treats 'false' and '' as false
+            value = 'y' if str(value).strip().lower() in TRUE_VALUES else ''
+        if isinstance(value, list):
+            for item in value:
+                formdata.add(name, item)
+        else:
+            formdata.add(name, str(value))
+    return formdata
+
+
+def validate(form_class, record):
+    # no request context: formdata is passed explicitly and CSRF is off
+    form = form_class(formdata=to_formdata(record), meta={'csrf': False})
+    if form.validate():
+        return form, None
+    return None, {field: errors for field, errors in form.errors.items()}
+
+
+def attach_areas(rows):
+    # venue/artist rows get their area like the create page sets it, with
+    # one area_for() per distinct city/state in the chunk
+    areas = {}
+    for row in rows:
+        pair = (row['city'], row['state'])
+        if pair not in areas:
+            areas[pair] = area_for(*pair)
+        area = areas[pair]
+        row.update(area_id=area.id, city=area.city, state=area.state)
+
+
+def known_foreign_keys(rows):
+    # one IN query per referenced table for the whole chunk
+    venue_ids = {r['venue_id'] for r in rows}
+    artist_ids = {r['artist_id'] for r in rows}
+    known_venues = {v.id for v in db.session.query(Venue.id).filter(Venue.id.in_(venue_ids))}
+    known_artists = {a.id for a in db.session.query(Artist.id).filter(Artist.id.in_(artist_ids))}
+    return known_venues, known_artists
+
+
+def import_chunk(kind, records, reject):
+    form_class, table, make_row = KINDS[kind]
+    rows = []
+    for number, record in records:
+        form, errors = validate(form_class, record)
+        if errors:
+            reject(number, record, errors)
+            continue
+        try:
+            rows.append((number, record, make_row(form)))
+        except (TypeError, ValueError) as err:
+            reject(number, record, {'row': [str(err)]})
+
+    if kind == 'shows' and rows:
+        known_venues, known_artists = known_foreign_keys([r for n, rec, r in rows])
+        # slots already in the database, plus each slot's first row in the
+        # chunk: the unique constraint would fail the whole executemany
+        taken = taken_slots({(r['venue_id'], r['start_time']) for n, rec, r in rows})
+        valid = []
+        for number, record, row in rows:
+            slot = (row['venue_id'], row['start_time'])
+            if row['venue_id'] not in known_venues:
+                reject(number, record, {'venue_id': ['unknown venue']})
+            elif row['artist_id'] not in known_artists:
+                reject(number, record, {'artist_id': ['unknown artist']})
+            elif slot in taken:
+                reject(number, record, {'start_time': [SLOT_TAKEN]})
+            else:
+                taken.add(slot)
+                valid.append((number, record, row))
+        rows = valid
+
+    if not rows:
+        return 0
+    insert_rows = [row for number, record, row in rows]
+    if kind != 'shows':
+        attach_areas(insert_rows)
+    db.session.execute(table.insert(), insert_rows)
+    if kind == 'shows':
+        venue_ids = {r['venue_id'] for r in insert_rows}
+        artist_ids = {r['artist_id'] for r in insert_rows}
+        refresh_counters(venue_ids, artist_ids)
+        current_app.extensions['profile_cache'].delete_many(
+            *[venue_cache_key(i) for i in venue_ids] + [artist_cache_key(i) for i in artist_ids])
+    db.session.commit()
+    return len(insert_rows)
+
+
+@click.command('import')
+@with_appcontext
+@click.argument('kind', type=click.Choice(sorted(KINDS)))
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'file_format', type=click.Choice(['csv', 'ndjson']),
+              help='Input format; guessed from the file extension by default.')
+@click.option('--chunk-size', default=1000, show_default=True,
+              help='Rows validated and inserted per transaction.')
+@click.option('--rejects', 'rejects_path', type=click.Path(dir_okay=False),
+              help='Where to write rejected rows (default: PATH.rejects.ndjson).')
+def import_command(kind, path, file_format, chunk_size, rejects_path):
+    """Bulk load venues, artists or shows from a CSV or NDJSON file."""
+    if file_format is None:
+        file_format = 'csv' if path.lower().endswith('.csv') else 'ndjson'
+    rejects_path = rejects_path or path + '.rejects.ndjson'
+
+    started = time.perf_counter()
+    imported = rejected = 0
+    with open(rejects_path, 'w', encoding='utf-8') as rejects:
+        def reject(number, record, errors):
+            nonlocal rejected
+            rejected += 1
+            rejects.write(json.dumps({'line': number, 'errors': errors, 'record': record},
+                                     default=str) + '\n')
+
+        records = read_records(path, file_format)
+        while True:
+            chunk = list(islice(records, chunk_size))
+            if not chunk:
+                break
+            imported += import_chunk(kind, chunk, reject)
+            elapsed = time.perf_counter() - started
+            click.echo('{} rows imported, {} rejected ({:.0f} rows/s)'.format(
+                imported, rejected, (imported + rejected) / elapsed if elapsed else 0))
+
+    elapsed = time.perf_counter() - started
+    click.echo('Done: {} {} imported, {} rejected in {:.1f}s ({:.0f} rows/s).'.format(
+        imported, kind, rejected, elapsed, (imported + rejected) / elapsed if elapsed else 0))
+    if rejected:
+        click.echo('Rejected rows written to {}'.format(rejects_path))
+    elif os.path.exists(rejects_path):
+        os.remove(rejects_path)
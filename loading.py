@@ -0,0 +1,45 @@
+from sqlalchemy import event
+from sqlalchemy.orm import Session, joinedload, raiseload, selectinload
+
+from model import Venue, Artist, Show
+
+# Named loader options. Each loads a whole object graph in a fixed number of
+# queries and makes every relationship it does not name raise rather than
+# emit SQL, so a template that wanders further fails loudly instead of
+# issuing a query per row. Like lazy='raise_on_sql' on the models, a
+# many-to-one whose target is already in the identity map (a show's
+# back-reference to the venue being loaded) is still served from it.
+#
+#   Venue.query.options(*VENUE_WITH_SHOWS).get(venue_id)    2 queries
+#   Show.query.options(*SHOW_WITH_VENUE_AND_ARTIST).all()   1 query
+
+# venue, then all its shows with their artists
+VENUE_WITH_SHOWS = (
+    selectinload(Venue.shows).joinedload(Show.artist, innerjoin=True),
+    raiseload('*', sql_only=True),
+)
+
+# artist, then all its shows with their venues
+ARTIST_WITH_SHOWS = (
+    selectinload(Artist.shows).joinedload(Show.venue, innerjoin=True),
+    raiseload('*', sql_only=True),
+)
+
+SHOW_WITH_VENUE_AND_ARTIST = (
+    joinedload(Show.venue, innerjoin=True),
+    joinedload(Show.artist, innerjoin=True),
+    raiseload('*', sql_only=True),
+)
+
+
+def raise_on_lazy_loads(state):
+    # adds raiseload('*', sql_only=True) to every ORM SELECT, including the
+    # ones that load relationships named in options, so anything not loaded
+    # up front raises when it would need a query
+    if state.is_select and not state.is_column_load:
+        state.statement = state.statement.options(raiseload('*', sql_only=True))
+
+
+def init_lazy_load_guard(app):
+    if app.config.get('ORM_RAISE_ON_LAZY_LOAD'):
+        event.listen(Session, 'do_orm_execute', raise_on_lazy_loads)
@@ -0,0 +1,231 @@
+import heapq
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import before_render_template, g, request, template_rendered
+from flask.signals import signals_available
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import QueuePool
+
+
+class PoolStats(object):
+    """How long requests wait to check a connection out of the pool."""
+
+    def __init__(self):
+        self.checkouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self._lock = threading.Lock()
+
+    def observe_checkout(self, seconds):
+        with self._lock:
+            self.checkouts += 1
+            self.total_wait += seconds
+            self.max_wait = max(self.max_wait, seconds)
+
+    def snapshot(self, pool):
+        stats = {
+            'checkouts': self.checkouts,
+            'checkout_avg_ms': round(1000 * self.total_wait / self.checkouts, 3) if self.checkouts else 0.0,
+            'checkout_max_ms': round(1000 * self.max_wait, 3),
+        }
+        # gauges only exist on QueuePool; SQLite test databases use other pools
+        if isinstance(pool, QueuePool):
+            stats.update({
+                'pool_size': pool.size(),
+                'in_use': pool.checkedout(),
+                'idle': pool.checkedin(),
+                'overflow': max(pool.overflow(), 0),
+            })
+        return stats
+
+
+pool_stats = PoolStats()
+
+
+class InstrumentedQueuePool(QueuePool):
+    # Pool.connect() covers waiting for a free slot, opening overflow
+    # connections and the pre-ping, i.e. everything a request waits on.
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            return super(InstrumentedQueuePool, self).connect()
+        finally:
+            pool_stats.observe_checkout(time.perf_counter() - start)
+
+
+def init_pool_metrics(app):
+    # must run before the first query, when Flask-SQLAlchemy creates the engine
+    options = app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', {})
+    if 'pool_size' in options:
+        options.setdefault('poolclass', InstrumentedQueuePool)
+
+
+class QueryStats(object):
+    """Statements issued while this collector is active on the thread."""
+
+    def __init__(self, keep_slowest=5):
+        self.count = 0
+        self.db_time = 0.0
+        self.render_time = 0.0
+        self.keep_slowest = keep_slowest
+        self.slowest = []  # min-heap of (seconds, statement)
+
+    def record_query(self, statement, seconds):
+        self.count += 1
+        self.db_time += seconds
+        if len(self.slowest) < self.keep_slowest:
+            heapq.heappush(self.slowest, (seconds, statement))
+        else:
+            heapq.heappushpop(self.slowest, (seconds, statement))
+
+    def slowest_statements(self):
+        return sorted(self.slowest, reverse=True)
+
+
+class RequestMetrics(object):
+    """Running totals per Flask endpoint, for /internal/stats."""
+
+    def __init__(self):
+        self.endpoints = {}
+        self._lock = threading.Lock()
+
+    def record(self, endpoint, stats, total_time):
+        with self._lock:
+            totals = self.endpoints.setdefault(endpoint, {
+                'requests': 0, 'queries': 0, 'max_queries': 0,
+                'db_ms': 0.0, 'render_ms': 0.0, 'total_ms': 0.0, 'slowest': []})
+            totals['requests'] += 1
+            totals['queries'] += stats.count
+            totals['max_queries'] = max(totals['max_queries'], stats.count)
+            totals['db_ms'] += 1000 * stats.db_time
+            totals['render_ms'] += 1000 * stats.render_time
+            totals['total_ms'] += 1000 * total_time
+            totals['slowest'] = sorted(totals['slowest'] + stats.slowest_statements(),
+                                       reverse=True)[:stats.keep_slowest]
+
+    def snapshot(self):
+        with self._lock:
+            return {endpoint: {
+                'requests': t['requests'],
+                'avg_queries': round(t['queries'] / t['requests'], 2),
+                'max_queries': t['max_queries'],
+                'avg_db_ms': round(t['db_ms'] / t['requests'], 3),
+                'avg_render_ms': round(t['render_ms'] / t['requests'], 3),
+                'avg_total_ms': round(t['total_ms'] / t['requests'], 3),
+                'slowest': [{'ms': round(1000 * s, 3), 'statement': sql} for s, sql in t['slowest']],
+            } for endpoint, t in self.endpoints.items()}
+
+
+request_metrics = RequestMetrics()
+
+# endpoint recorded for requests no route matched (request.endpoint is None)
+UNMATCHED = '<unmatched>'
+
+# collectors currently counting on this thread: the request's own plus any
+# opened with count_queries()
+_active = threading.local()
+
+
+def _collectors():
+    if not hasattr(_active, 'collectors'):
+        _active.collectors = []
+    return _active.collectors
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_start', []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info['query_start'].pop()
+    for stats in _collectors():
+        stats.record_query(statement, elapsed)
+
+
+@contextmanager
+def count_queries():
+    """Count the statements issued inside the block (used by tests/benchmarks)."""
+    stats = QueryStats()
+    _collectors().append(stats)
+    try:
+        yield stats
+    finally:
+        _collectors().remove(stats)
+
+
+def assert_query_budget(client, url, max_queries, method='GET', **kwargs):
+    # e.g. assert_query_budget(app.test_client(), '/venues', 1)
+    with count_queries() as stats:
+        response = client.open(url, method=method, **kwargs)
+    assert stats.count <= max_queries, '{} {} issued {} queries, budget is {}:\n{}'.format(
+        method, url, stats.count, max_queries,
+        '\n'.join(sql for s, sql in stats.slowest_statements()))
+    return response
+
+
+def init_request_metrics(app):
+    """Count queries, DB time and template render time per request.
+
+    Requests slower than SLOW_REQUEST_MS, statements slower than SLOW_QUERY_MS
+    and requests issuing more than QUERY_COUNT_BUDGET statements are logged
+    through app.logger. QUERY_STATS_HEADERS adds X-Query-Count and
+    Server-Timing to every response.
+    """
+
+    @app.before_request
+    def start_query_stats():
+        g.request_started = time.perf_counter()
+        g.query_stats = QueryStats()
+        _collectors().append(g.query_stats)
+
+    @app.after_request
+    def finish_query_stats(response):
+        stats = g.get('query_stats')
+        if stats is None:
+            return response
+        total = time.perf_counter() - g.request_started
+        request_metrics.record(request.endpoint or UNMATCHED, stats, total)
+
+        slow_query = app.config['SLOW_QUERY_MS'] / 1000.0
+        for seconds, statement in stats.slowest_statements():
+            if seconds > slow_query:
+                app.logger.warning('slow query (%.1f ms) in %s: %s',
+                                   1000 * seconds, request.endpoint, statement)
+        if stats.count > app.config['QUERY_COUNT_BUDGET']:
+            app.logger.warning('%s issued %d queries (budget %d)', request.endpoint,
+                               stats.count, app.config['QUERY_COUNT_BUDGET'])
+        if total > app.config['SLOW_REQUEST_MS'] / 1000.0:
+            app.logger.warning('slow request %s %s: %.1f ms total, %d queries in %.1f ms, render %.1f ms',
+                               request.method, request.path, 1000 * total,
+                               stats.count, 1000 * stats.db_time, 1000 * stats.render_time)
+
+        if app.config['QUERY_STATS_HEADERS']:
+            response.headers['X-Query-Count'] = str(stats.count)
+            response.headers['Server-Timing'] = 'db;dur={:.1f}, render;dur={:.1f}, total;dur={:.1f}'.format(
+                1000 * stats.db_time, 1000 * stats.render_time, 1000 * total)
+        return response
+
+    @app.teardown_request
+    def stop_query_stats(exc):
+        stats = g.pop('query_stats', None)
+        if stats in _collectors():
+            _collectors().remove(stats)
+
+    def render_started(sender, template, context, **extra):
+        g.render_started = time.perf_counter()
+
+    def render_finished(sender, template, context, **extra):
+        stats = g.get('query_stats')
+        if stats is not None and 'render_started' in g:
+            stats.render_time += time.perf_counter() - g.pop('render_started')
+
+    # Flask's signals need blinker (in requirements.txt); without it render
+    # time is simply not measured
+    if signals_available:
+        before_render_template.connect(render_started, app, weak=False)
+        template_rendered.connect(render_finished, app, weak=False)
@@ -0,0 +1,32 @@
+"""indexes for listings, name lookups and profile shows
+
+Revision ID: 2d7a6c8f1e53
+Revises: 9b3e5d21c7a4
+Create Date: 2026-10-18 13:14:22
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2d7a6c8f1e53'
+down_revision = '9b3e5d21c7a4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_Venue_name', 'Venue', ['name'], unique=False)
+    op.create_index('ix_Venue_state_city', 'Venue', ['state', 'city'], unique=False)
+    op.create_index('ix_Artist_name', 'Artist', ['name'], unique=False)
+    op.create_index('ix_Shows_venue_id_start_time', 'Shows', ['venue_id', 'start_time'], unique=False)
+    op.create_index('ix_Shows_artist_id_start_time', 'Shows', ['artist_id', 'start_time'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_Shows_artist_id_start_time', table_name='Shows')
+    op.drop_index('ix_Shows_venue_id_start_time', table_name='Shows')
+    op.drop_index('ix_Artist_name', table_name='Artist')
+    op.drop_index('ix_Venue_state_city', table_name='Venue')
+    op.drop_index('ix_Venue_name', table_name='Venue')
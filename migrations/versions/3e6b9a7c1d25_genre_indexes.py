@@ -0,0 +1,27 @@
+"""GIN indexes for genre filters
+
+Revision ID: 3e6b9a7c1d25
+Revises: b8a1f6d04e93
+Create Date: 2026-10-18 14:11:56
+
+Serve `genres @> ARRAY[...]` on Postgres; other backends get a plain index.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3e6b9a7c1d25'
+down_revision = 'b8a1f6d04e93'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_Venue_genres', 'Venue', ['genres'], unique=False, postgresql_using='gin')
+    op.create_index('ix_Artist_genres', 'Artist', ['genres'], unique=False, postgresql_using='gin')
+
+
+def downgrade():
+    op.drop_index('ix_Artist_genres', table_name='Artist')
+    op.drop_index('ix_Venue_genres', table_name='Venue')
@@ -0,0 +1,46 @@
+"""one show per venue and start time
+
+Revision ID: 5c9d2e7f3a41
+Revises: e2f94c1b8a67
+Create Date: 2026-10-18 13:52:30
+
+The unique constraint replaces ix_Shows_venue_id_start_time and serves the
+same lookups. Duplicate slots already in the table have to be resolved by
+hand first; the upgrade lists them and stops.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5c9d2e7f3a41'
+down_revision = 'e2f94c1b8a67'
+branch_labels = None
+depends_on = None
+
+shows = sa.table('Shows', sa.column('id', sa.Integer), sa.column('venue_id', sa.Integer),
+                 sa.column('start_time', sa.DateTime))
+
+
+def upgrade():
+    duplicates = op.get_bind().execute(
+        sa.select(shows.c.venue_id, shows.c.start_time, sa.func.count())
+        .group_by(shows.c.venue_id, shows.c.start_time)
+        .having(sa.func.count() > 1)
+        .order_by(shows.c.venue_id, shows.c.start_time)
+        .limit(20)).all()
+    if duplicates:
+        raise RuntimeError(
+            'Shows has venues booked twice for the same start time; move or delete the '
+            'extra shows before adding uq_Shows_venue_id_start_time:\n' + '\n'.join(
+                '  venue {}, {}: {} shows'.format(*row) for row in duplicates))
+
+    with op.batch_alter_table('Shows') as batch_op:
+        batch_op.drop_index('ix_Shows_venue_id_start_time')
+        batch_op.create_unique_constraint('uq_Shows_venue_id_start_time', ['venue_id', 'start_time'])
+
+
+def downgrade():
+    with op.batch_alter_table('Shows') as batch_op:
+        batch_op.drop_constraint('uq_Shows_venue_id_start_time', type_='unique')
+        batch_op.create_index('ix_Shows_venue_id_start_time', ['venue_id', 'start_time'], unique=False)
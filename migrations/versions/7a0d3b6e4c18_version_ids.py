@@ -0,0 +1,29 @@
+"""version_id counters for optimistic locking and API ETags
+
+Revision ID: 7a0d3b6e4c18
+Revises: c5e81f4a9d02
+Create Date: 2026-10-18 13:31:47
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7a0d3b6e4c18'
+down_revision = 'c5e81f4a9d02'
+branch_labels = None
+depends_on = None
+
+TABLES = ('Venue', 'Artist', 'Shows')
+
+
+def upgrade():
+    for table in TABLES:
+        op.add_column(table, sa.Column('version_id', sa.Integer(), server_default='1', nullable=False))
+
+
+def downgrade():
+    for table in reversed(TABLES):
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.drop_column('version_id')
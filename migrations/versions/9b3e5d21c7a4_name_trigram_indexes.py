@@ -0,0 +1,34 @@
+"""trigram indexes for name search
+
+Revision ID: 9b3e5d21c7a4
+Revises: 4f1c0a6e2b10
+Create Date: 2026-10-18 13:09:40
+
+Name search is ILIKE '%term%', which only a pg_trgm GIN index can serve.
+Other backends get a plain index on name.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9b3e5d21c7a4'
+down_revision = '4f1c0a6e2b10'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        # needs a role allowed to create extensions, or run once by hand
+        op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    op.create_index('ix_Venue_name_trgm', 'Venue', ['name'], unique=False,
+                    postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'})
+    op.create_index('ix_Artist_name_trgm', 'Artist', ['name'], unique=False,
+                    postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'})
+
+
+def downgrade():
+    # the extension stays: other objects may depend on it
+    op.drop_index('ix_Artist_name_trgm', table_name='Artist')
+    op.drop_index('ix_Venue_name_trgm', table_name='Venue')
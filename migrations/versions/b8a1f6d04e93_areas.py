@@ -0,0 +1,54 @@
+"""normalized areas for venues and artists
+
+Revision ID: b8a1f6d04e93
+Revises: 5c9d2e7f3a41
+Create Date: 2026-10-18 14:03:18
+
+/venues groups on Area, so the revision also attaches every existing venue
+and artist to one (areas.backfill_areas). Rows without a city or state
+keep a NULL area_id.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from areas import backfill_areas
+
+
+# revision identifiers, used by Alembic.
+revision = 'b8a1f6d04e93'
+down_revision = '5c9d2e7f3a41'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('Area',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('city', sa.String(length=120), nullable=False),
+    sa.Column('state', sa.String(length=120), nullable=False),
+    sa.Column('city_key', sa.String(length=120), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('state', 'city_key', name='uq_Area_state_city_key')
+    )
+    for table in ('Venue', 'Artist'):
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.add_column(sa.Column('area_id', sa.Integer(), nullable=True))
+            batch_op.create_foreign_key('{}_area_id_fkey'.format(table), 'Area', ['area_id'], ['id'])
+            if table == 'Venue':
+                batch_op.drop_index('ix_Venue_state_city')
+            batch_op.create_index('ix_{}_area_id_name'.format(table), ['area_id', 'name'], unique=False)
+
+    backfill_areas(op.get_bind())
+
+
+def downgrade():
+    for table in ('Artist', 'Venue'):
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.drop_index('ix_{}_area_id_name'.format(table))
+            if table == 'Venue':
+                batch_op.create_index('ix_Venue_state_city', ['state', 'city'], unique=False)
+            if op.get_bind().dialect.name != 'sqlite':
+                # SQLite drops it with the column when the table is copied
+                batch_op.drop_constraint('{}_area_id_fkey'.format(table), type_='foreignkey')
+            batch_op.drop_column('area_id')
+    op.drop_table('Area')
@@ -0,0 +1,50 @@
+"""upcoming and past show counters on venues and artists
+
+Revision ID: c5e81f4a9d02
+Revises: 2d7a6c8f1e53
+Create Date: 2026-10-18 13:20:05
+
+The counters are filled from Shows here; from then on they are maintained
+on write and by `flask counters roll`.
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c5e81f4a9d02'
+down_revision = '2d7a6c8f1e53'
+branch_labels = None
+depends_on = None
+
+COUNTERS = ('upcoming_shows_count', 'past_shows_count')
+
+shows = sa.table('Shows', sa.column('venue_id', sa.Integer), sa.column('artist_id', sa.Integer),
+                 sa.column('start_time', sa.DateTime))
+
+
+def upgrade():
+    for table in ('Venue', 'Artist'):
+        for name in COUNTERS:
+            op.add_column(table, sa.Column(name, sa.Integer(), server_default='0', nullable=False))
+
+    now = datetime.now()
+    for table, fk_column in (('Venue', shows.c.venue_id), ('Artist', shows.c.artist_id)):
+        entity = sa.table(table, sa.column('id', sa.Integer),
+                          *(sa.column(name, sa.Integer) for name in COUNTERS))
+
+        def count(*criteria):
+            return sa.select(sa.func.count()).where(fk_column == entity.c.id, *criteria) \
+                .scalar_subquery()
+
+        op.execute(entity.update().values(upcoming_shows_count=count(shows.c.start_time > now),
+                                          past_shows_count=count(shows.c.start_time <= now)))
+
+
+def downgrade():
+    for table in ('Artist', 'Venue'):
+        with op.batch_alter_table(table) as batch_op:
+            for name in reversed(COUNTERS):
+                batch_op.drop_column(name)
@@ -0,0 +1,67 @@
+"""created_at/updated_at change tracking
+
+Revision ID: e2f94c1b8a67
+Revises: 7a0d3b6e4c18
+Create Date: 2026-10-18 13:40:12
+
+Shows.updated_datetime is renamed to updated_at, so existing timestamps
+survive, and also becomes the shows' created_at: it was only ever written
+on insert. Venues and artists have no history and start at the time of
+the upgrade.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e2f94c1b8a67'
+down_revision = '7a0d3b6e4c18'
+branch_labels = None
+depends_on = None
+
+
+def recreate():
+    # SQLite cannot ADD COLUMN with a non-constant default like
+    # CURRENT_TIMESTAMP, nor alter one, so it copies the table instead
+    return 'always' if op.get_bind().dialect.name == 'sqlite' else 'auto'
+
+
+def timestamp(name, **kwargs):
+    return sa.Column(name, sa.DateTime(), server_default=sa.func.now(), nullable=False, **kwargs)
+
+
+def upgrade():
+    for table in ('Venue', 'Artist'):
+        with op.batch_alter_table(table, recreate=recreate()) as batch_op:
+            batch_op.add_column(timestamp('created_at'))
+            batch_op.add_column(timestamp('updated_at'))
+
+    with op.batch_alter_table('Shows') as batch_op:
+        batch_op.alter_column('updated_datetime', new_column_name='updated_at')
+    shows = sa.table('Shows', sa.column('updated_at', sa.DateTime))
+    op.execute(shows.update().where(shows.c.updated_at.is_(None)).values(updated_at=sa.func.now()))
+    if op.get_bind().dialect.name == 'sqlite':
+        # whole seconds, the way CURRENT_TIMESTAMP writes them (see
+        # model.change_timestamp)
+        op.execute(shows.update().values(updated_at=sa.func.datetime(shows.c.updated_at)))
+    with op.batch_alter_table('Shows', recreate=recreate()) as batch_op:
+        batch_op.alter_column('updated_at', existing_type=sa.DateTime(),
+                              server_default=sa.func.now(), nullable=False)
+        batch_op.add_column(timestamp('created_at'))
+    op.execute('UPDATE "Shows" SET created_at = updated_at')
+
+    for table in ('Venue', 'Artist', 'Shows'):
+        op.create_index('ix_{}_updated_at_id'.format(table), table, ['updated_at', 'id'], unique=False)
+
+
+def downgrade():
+    for table in ('Shows', 'Artist', 'Venue'):
+        op.drop_index('ix_{}_updated_at_id'.format(table), table_name=table)
+    with op.batch_alter_table('Shows', recreate=recreate()) as batch_op:
+        batch_op.drop_column('created_at')
+        batch_op.alter_column('updated_at', existing_type=sa.DateTime(), server_default=None,
+                              nullable=True, new_column_name='updated_datetime')
+    for table in ('Artist', 'Venue'):
+        with op.batch_alter_table(table, recreate=recreate()) as batch_op:
+            batch_op.drop_column('updated_at')
+            batch_op.drop_column('created_at')
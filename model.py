@@ -1,68 +1,177 @@
-from flask_sqlalchemy import SQLAlchemy
-db = SQLAlchemy()
-from datetime import date
-
-class Venue(db.Model):
-    __tablename__ = 'Venue'
-
-    id = db.Column(db.Integer, primary_key=True)
-    name = db.Column(db.String)
-    city = db.Column(db.String(120))
-    state = db.Column(db.String(120))
-    address = db.Column(db.String(120))
-    phone = db.Column(db.String(120))
-    image_link = db.Column(db.String(500))
-    facebook_link = db.Column(db.String(120))
-
-    # TODO: implement any missing fields, as a database migration using Flask-Migrate
-
-  # Name must be similar as defined in view(show_venue.html)
-    seeking_talent = db.Column(db.Boolean)
-    seeking_description = db.Column(db.String(500))
-    website = db.Column(db.String(200))
-    shows = db.relationship('Show',backref='venue',lazy=True)  #Foregin key ref relation with Master table
-    genres = db.Column(db.ARRAY(db.String()))  
-    # past_show = db.relationship('Shows',backref='venue',lazy=True)
-
-    def __repr__(self):
-        return f'<VenueID:{self.id} || Venue_Name: {self.name}>'
-
-class Artist(db.Model):
-    __tablename__ = 'Artist'
-    id = db.Column(db.Integer, primary_key=True)
-    name = db.Column(db.String)
-    city = db.Column(db.String(120))
-    state = db.Column(db.String(120))
-    phone = db.Column(db.String(120))
-    genres = db.Column(db.ARRAY(db.String()))
-    image_link = db.Column(db.String(500))
-    facebook_link = db.Column(db.String(120))
-    shows = db.relationship('Show',backref='artist',lazy=True)  #Foregin key ref relation with Master table
-
-    # TODO: implement any missing fields, as a database migration using Flask-Migrate
-    
-    # get column names from show_artist.html
-    # genre = db.Column(db.String(120))
-    website = db.Column(db.String(200)) 
-    seeking_venue = db.Column(db.Boolean,nullable=False, default=False)
-    seeking_description = db.Column(db.String()) 
-    
-    def __repr__(self):
-        return f'<ArtistID:{self.id} || Artist_Name: {self.name}>'
-
-
-
-# TODO Implement Show and Artist models, and complete all model relationships and properties, as a database migration.
-
-class Show(db.Model):
-    __tablename__ = 'Shows'
-    id = db.Column(db.Integer, primary_key=True)  
-    start_time = db.Column(db.DateTime)  
-    # foregin key with Venu class
-    venue_id = db.Column(db.Integer, db.ForeignKey('Venue.id'), nullable=False)
-    # foreign key with Artist
-    artist_id = db.Column(db.Integer, db.ForeignKey('Artist.id'), nullable=False)
-    updated_datetime = db.Column(db.DateTime, default=date.today())
-    
-    def __repr__(self):
-        return f'<ShowID:{self.id} || Show_Start: {self.start_time}>'
+from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import DDL, event
+from sqlalchemy.dialects import postgresql, sqlite
+db = SQLAlchemy()
+
+# name searches use ILIKE '%term%', which only an index over trigrams can serve
+event.listen(db.Model.metadata, 'before_create',
+             DDL('CREATE EXTENSION IF NOT EXISTS pg_trgm').execute_if(dialect='postgresql'))
+
+def trigram_index(name, column):
+    # GIN trigram index on Postgres; a plain index on other backends
+    return db.Index(name, column, postgresql_using='gin',
+                    postgresql_ops={column: 'gin_trgm_ops'})
+
+def genre_list():
+    # an ARRAY on Postgres (the dialect's own type, which has the `@>`
+    # comparator); a JSON list on SQLite, which has no arrays
+    return postgresql.ARRAY(db.String()).with_variant(db.JSON(), 'sqlite')
+
+def change_timestamp():
+    # created_at/updated_at. SQLite's CURRENT_TIMESTAMP writes whole seconds
+    # as text, so the values bound against these columns are formatted the
+    # same way; with microseconds they would not compare equal to (or
+    # between) stored values
+    return db.DateTime().with_variant(sqlite.DATETIME(
+        storage_format='%(year)04d-%(month)02d-%(day)02d %(hour)02d:%(minute)02d:%(second)02d'),
+        'sqlite')
+
+def genres_index(name):
+    # GIN index for `genres @> ARRAY[...]` containment, see queries.genres_match
+    return db.Index(name, 'genres', postgresql_using='gin')
+
+class Area(db.Model):
+    # normalized city/state that venues and artists point at, see areas.py.
+    # city_key is the case-folded city, so spellings differing only in case
+    # and spacing are one area
+    __tablename__ = 'Area'
+    __table_args__ = (
+        db.UniqueConstraint('state', 'city_key', name='uq_Area_state_city_key'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    city = db.Column(db.String(120), nullable=False)
+    state = db.Column(db.String(120), nullable=False)
+    city_key = db.Column(db.String(120), nullable=False)
+
+    def __repr__(self):
+        return f'<AreaID:{self.id} || {self.city}, {self.state}>'
+
+class Venue(db.Model):
+    __tablename__ = 'Venue'
+    __table_args__ = (
+        trigram_index('ix_Venue_name_trgm', 'name'),
+        db.Index('ix_Venue_name', 'name'),
+        db.Index('ix_Venue_area_id_name', 'area_id', 'name'),
+        genres_index('ix_Venue_genres'),
+        db.Index('ix_Venue_updated_at_id', 'updated_at', 'id'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String)
+    city = db.Column(db.String(120))
+    state = db.Column(db.String(120))
+    # set with city/state on every write (areas.place); the areas migration
+    # backfills existing rows, so it is only null without a city or state
+    area_id = db.Column(db.Integer, db.ForeignKey('Area.id'))
+    address = db.Column(db.String(120))
+    phone = db.Column(db.String(120))
+    image_link = db.Column(db.String(500))
+    facebook_link = db.Column(db.String(120))
+
+    # TODO: implement any missing fields, as a database migration using Flask-Migrate
+
+  # Name must be similar as defined in view(show_venue.html)
+    seeking_talent = db.Column(db.Boolean)
+    seeking_description = db.Column(db.String(500))
+    website = db.Column(db.String(200))
+    # collections are never lazy loaded: use the options in loading.py.
+    # passive_deletes leaves the shows to the foreign key on delete instead
+    # of loading them
+    shows = db.relationship('Show', back_populates='venue', lazy='raise_on_sql',
+                            passive_deletes=True)
+    genres = db.Column(genre_list())  
+    # past_show = db.relationship('Shows',backref='venue',lazy=True)
+    # maintained on write, see counters.py
+    upcoming_shows_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    past_shows_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    # change tracking, maintained by the database; drives /api/changes and
+    # incremental exports
+    created_at = db.Column(change_timestamp(), nullable=False, server_default=db.func.now())
+    updated_at = db.Column(change_timestamp(), nullable=False, server_default=db.func.now(),
+                           onupdate=db.func.now())
+    # bumped by every ORM update; the JSON API derives its ETags from it
+    version_id = db.Column(db.Integer, nullable=False, default=1, server_default='1')
+    __mapper_args__ = {'version_id_col': version_id}
+
+    def __repr__(self):
+        return f'<VenueID:{self.id} || Venue_Name: {self.name}>'
+
+class Artist(db.Model):
+    __tablename__ = 'Artist'
+    __table_args__ = (
+        trigram_index('ix_Artist_name_trgm', 'name'),
+        db.Index('ix_Artist_name', 'name'),
+        db.Index('ix_Artist_area_id_name', 'area_id', 'name'),
+        genres_index('ix_Artist_genres'),
+        db.Index('ix_Artist_updated_at_id', 'updated_at', 'id'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String)
+    city = db.Column(db.String(120))
+    state = db.Column(db.String(120))
+    area_id = db.Column(db.Integer, db.ForeignKey('Area.id'))
+    phone = db.Column(db.String(120))
+    genres = db.Column(genre_list())
+    image_link = db.Column(db.String(500))
+    facebook_link = db.Column(db.String(120))
+    shows = db.relationship('Show', back_populates='artist', lazy='raise_on_sql',
+                            passive_deletes=True)
+
+    # TODO: implement any missing fields, as a database migration using Flask-Migrate
+    
+    # get column names from show_artist.html
+    # genre = db.Column(db.String(120))
+    website = db.Column(db.String(200)) 
+    seeking_venue = db.Column(db.Boolean,nullable=False, default=False)
+    seeking_description = db.Column(db.String()) 
+    # maintained on write, see counters.py
+    upcoming_shows_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    past_shows_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    # change tracking, maintained by the database; drives /api/changes and
+    # incremental exports
+    created_at = db.Column(change_timestamp(), nullable=False, server_default=db.func.now())
+    updated_at = db.Column(change_timestamp(), nullable=False, server_default=db.func.now(),
+                           onupdate=db.func.now())
+    # bumped by every ORM update; the JSON API derives its ETags from it
+    version_id = db.Column(db.Integer, nullable=False, default=1, server_default='1')
+    __mapper_args__ = {'version_id_col': version_id}
+
+    def __repr__(self):
+        return f'<ArtistID:{self.id} || Artist_Name: {self.name}>'
+
+
+
+# TODO Implement Show and Artist models, and complete all model relationships and properties, as a database migration.
+
+class Show(db.Model):
+    __tablename__ = 'Shows'
+    # profile pages and upcoming-show counts filter on one foreign key and a
+    # start_time range, so both access paths get a composite index. The
+    # venue's is unique: a venue cannot host two shows starting together.
+    __table_args__ = (
+        db.UniqueConstraint('venue_id', 'start_time', name='uq_Shows_venue_id_start_time'),
+        db.Index('ix_Shows_artist_id_start_time', 'artist_id', 'start_time'),
+        db.Index('ix_Shows_updated_at_id', 'updated_at', 'id'),
+    )
+    id = db.Column(db.Integer, primary_key=True)  
+    start_time = db.Column(db.DateTime)  
+    # foregin key with Venu class
+    venue_id = db.Column(db.Integer, db.ForeignKey('Venue.id'), nullable=False)
+    # foreign key with Artist
+    artist_id = db.Column(db.Integer, db.ForeignKey('Artist.id'), nullable=False)
+    # many-to-one: lazy loads are a single-row get, but still raise when
+    # ORM_RAISE_ON_LAZY_LOAD is set (see loading.py)
+    venue = db.relationship('Venue', back_populates='shows', lazy='select')
+    artist = db.relationship('Artist', back_populates='shows', lazy='select')
+    # change tracking, maintained by the database; drives /api/changes and
+    # incremental exports
+    created_at = db.Column(change_timestamp(), nullable=False, server_default=db.func.now())
+    updated_at = db.Column(change_timestamp(), nullable=False, server_default=db.func.now(),
+                           onupdate=db.func.now())
+    # bumped by every ORM update; the JSON API derives its ETags from it
+    version_id = db.Column(db.Integer, nullable=False, default=1, server_default='1')
+    __mapper_args__ = {'version_id_col': version_id}
+    
+    def __repr__(self):
+        return f'<ShowID:{self.id} || Show_Start: {self.start_time}>'
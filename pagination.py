@@ -0,0 +1,100 @@
+import base64
+import json
+from collections import namedtuple
+from datetime import datetime
+
+from flask import abort, current_app, request
+from sqlalchemy import tuple_
+
+# rows of the current page plus the opaque cursors of its neighbours
+# (None when there is no page in that direction)
+Page = namedtuple('Page', ['rows', 'next_cursor', 'prev_cursor'])
+
+
+# JSON values a cursor may hold besides tagged datetimes
+CURSOR_SCALARS = (str, int, float, bool, type(None))
+
+
+def encode_cursor(values):
+    # datetimes are tagged so decode_cursor can restore them for comparison
+    payload = [{'dt': v.isoformat()} if isinstance(v, datetime) else v for v in values]
+    raw = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    # raises ValueError on anything that was not produced by encode_cursor
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        payload = json.loads(raw)
+    except (TypeError, ValueError) as err:
+        raise ValueError('invalid cursor') from err
+    if not isinstance(payload, list):
+        raise ValueError('invalid cursor')
+    values = []
+    for v in payload:
+        if isinstance(v, dict):
+            if list(v) != ['dt'] or not isinstance(v['dt'], str):
+                raise ValueError('invalid cursor')
+            v = datetime.fromisoformat(v['dt'])
+        elif not isinstance(v, CURSOR_SCALARS):
+            raise ValueError('invalid cursor')
+        values.append(v)
+    return values
+
+
+def cursor_values(cursor, columns):
+    # a cursor from another listing (or a made-up one) has the wrong arity
+    values = decode_cursor(cursor)
+    if len(values) != len(columns):
+        raise ValueError('invalid cursor')
+    return values
+
+
+def keyset_paginate(query, columns, key, after=None, before=None, per_page=50):
+    """Return one Page of `query` ordered by `columns`.
+
+    `columns` is the unique sort key (ending with a primary key) and `key`
+    maps a result row to the values of those columns. Pages are selected with
+    a row-value comparison on the key instead of OFFSET, so every page costs
+    the same index range scan no matter how deep it is.
+    """
+    sort_key = tuple_(*columns)
+    # cursor values are bound with the column types, so they are stored-format
+    # comparable (see model.change_timestamp)
+    types = [c.type for c in columns]
+    backwards = before is not None
+    if after is not None:
+        query = query.filter(sort_key > tuple_(*cursor_values(after, columns), types=types))
+    if backwards:
+        query = query.filter(sort_key < tuple_(*cursor_values(before, columns), types=types))
+        query = query.order_by(*[c.desc() for c in columns])
+    else:
+        query = query.order_by(*columns)
+
+    # one extra row tells us whether there is a page beyond this one
+    rows = query.limit(per_page + 1).all()
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    if backwards:
+        rows.reverse()
+    if not rows:
+        return Page(rows, None, None)
+
+    next_cursor = encode_cursor(key(rows[-1])) if (has_more or backwards) else None
+    prev_cursor = encode_cursor(key(rows[0])) if ((has_more and backwards) or after is not None) else None
+    return Page(rows, next_cursor, prev_cursor)
+
+
+def paginate(query, columns, key):
+    # keyset_paginate driven by the ?after=/?before= cursors and ?limit= of
+    # the current request; bad cursors are a 400
+    per_page = request.args.get('limit', current_app.config['PAGE_SIZE'], type=int)
+    per_page = min(max(per_page, 1), current_app.config['MAX_PAGE_SIZE'])
+    try:
+        return keyset_paginate(query, columns, key,
+                               after=request.args.get('after'),
+                               before=request.args.get('before'),
+                               per_page=per_page)
+    except ValueError:
+        abort(400)
@@ -0,0 +1,228 @@
+import hashlib
+import time
+from datetime import datetime, timedelta
+
+import dateutil.parser
+from flask import abort, current_app, request
+
+from sqlalchemy import and_, true
+
+from cache import get_or_set
+from forms import GENRES
+from model import db, Venue, Artist, Show
+from read_models import venue_row, artist_row
+
+# Read queries shared by the HTML views in app.py and the JSON API in api.py.
+
+
+def parse_datetime_arg(name, default=None):
+    value = request.args.get(name)
+    if not value:
+        return default
+    try:
+        return dateutil.parser.parse(value)
+    except (ValueError, OverflowError):
+        abort(400)
+
+
+def settled_before():
+    """Cutoff for change tracking: /api/changes and exports only read rows
+    whose updated_at is older than this.
+
+    updated_at is the database's now(), which on Postgres is the start of
+    the writing transaction, so a row can commit with a timestamp a reader
+    has already paged past. Holding back the last CHANGES_SETTLE_SECONDS
+    keeps such rows in the feed as long as no write transaction runs longer
+    than that.
+    """
+    now = db.session.scalar(db.select(db.func.now()))
+    return now - timedelta(seconds=current_app.config['CHANGES_SETTLE_SECONDS'])
+
+
+def show_window_query(columns, window_from, window_to=None):
+    # shows starting in [window_from, window_to), joined to their venue and
+    # artist so `columns` can project from all three tables
+    query = db.session.query(*columns) \
+        .join(Venue, Venue.id == Show.venue_id) \
+        .join(Artist, Artist.id == Show.artist_id) \
+        .filter(Show.start_time >= window_from)
+    if window_to is not None:
+        query = query.filter(Show.start_time < window_to)
+    return query
+
+
+def name_search(column, search_term):
+    # case-insensitive substring match on `column` plus an ordering that puts
+    # prefix matches first. ILIKE '%term%' is served by the pg_trgm GIN index
+    # on Postgres; other backends (SQLite in tests) fall back to lower() LIKE.
+    escaped = search_term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    match = column.ilike('%{}%'.format(escaped), escape='\\')
+    prefix_first = db.case((column.ilike('{}%'.format(escaped), escape='\\'), 0), else_=1)
+    return match, (prefix_first, column)
+
+
+#  Genres
+#  ----------------------------------------------------------------
+# genres is an ARRAY on Postgres, where `@>` containment is served by the
+# GIN index on the column, and a JSON list on SQLite (tests), where
+# json_each() stands in for unnest().
+
+def is_postgres():
+    return db.engine.dialect.name == 'postgresql'
+
+
+def genre_args(source=None):
+    # the known genres among the repeated ?genre= (or form) values
+    source = request.values if source is None else source
+    return [genre for genre in source.getlist('genre') if genre in GENRES]
+
+
+def genre_values(column):
+    # FROM-able set of one `value` row per element of an ARRAY/JSON column
+    if is_postgres():
+        return db.func.unnest(column).table_valued('value').render_derived()
+    return db.func.json_each(column).table_valued('value')
+
+
+def genres_match(column, genres):
+    # rows whose genres include every one of `genres`
+    if is_postgres():
+        return column.contains(genres)
+    conditions = []
+    for genre in genres:
+        values = genre_values(column)
+        conditions.append(db.select(values.c.value).where(values.c.value == genre).exists())
+    return and_(*conditions)
+
+
+def filter_genres(query, column, genres):
+    return query.filter(genres_match(column, genres)) if genres else query
+
+
+def genre_facets(query, column, selected=()):
+    """[(genre, count)] over the rows of `query`, most common first.
+
+    One aggregate over the unnested `column` of the already filtered query,
+    whatever its joins and columns. Selected genres are always listed, with
+    a count of 0 when nothing matches, so they can be deselected.
+    """
+    rows = query.with_entities(column.label('genres')).order_by(None).subquery()
+    values = genre_values(rows.c.genres)
+    count = db.func.count().label('count')
+    counts = db.session.query(values.c.value, count) \
+        .select_from(rows).join(values, true()) \
+        .group_by(values.c.value) \
+        .order_by(count.desc(), values.c.value) \
+        .all()
+    facets = [(genre, n) for genre, n in counts]
+    listed = {genre for genre, n in facets}
+    return facets + [(genre, 0) for genre in selected if genre not in listed]
+
+
+def cached_genre_facets(version, query, column, selected=()):
+    """genre_facets() through the facet cache.
+
+    `version` has to change whenever the counts can: the table_version() of
+    the listing plus any filter besides the genres. Entries also roll over
+    every HTTP_CACHE_VERSION_BUCKET seconds, like the page ETags, because
+    windows such as "upcoming" move with the clock.
+    """
+    bucket = int(time.time() // current_app.config['HTTP_CACHE_VERSION_BUCKET'])
+    key = hashlib.sha1(repr((request.endpoint, version, sorted(selected), bucket))
+                       .encode('utf-8')).hexdigest()
+    return get_or_set(current_app.extensions['facet_cache'], key,
+                      lambda: genre_facets(query, column, selected))
+
+
+#  Profiles
+#  ----------------------------------------------------------------
+
+def profile_shows(show_query, fk_column, entity_id):
+    # upcoming shows (soonest first) and the most recent past shows, each
+    # limited to PROFILE_SHOWS_LIMIT, with full totals from one aggregate.
+    # A single `now` keeps a show from landing on both sides of the split.
+    now = datetime.now()
+    limit = current_app.config['PROFILE_SHOWS_LIMIT']
+    upcoming = show_query.filter(Show.start_time > now) \
+        .order_by(Show.start_time, Show.id).limit(limit).all()
+    past = show_query.filter(Show.start_time <= now) \
+        .order_by(Show.start_time.desc(), Show.id.desc()).limit(limit).all()
+    upcoming_count, past_count = db.session.query(
+        db.func.count(db.case((Show.start_time > now, Show.id))),
+        db.func.count(db.case((Show.start_time <= now, Show.id)))
+    ).filter(fk_column == entity_id).one()
+
+    return {
+        "past_shows": [dict(s._mapping) for s in past],
+        "upcoming_shows": [dict(s._mapping) for s in upcoming],
+        "past_shows_count": past_count,
+        "upcoming_shows_count": upcoming_count,
+    }
+
+
+def venue_profile(venue_id):
+    venue = venue_row(venue_id)
+
+    # artist details of the venue's shows, split into upcoming/past in SQL
+    venue_shows = db.session.query(
+        Artist.id.label('artist_id'),
+        Artist.name.label('artist_name'),
+        Artist.image_link.label('artist_image_link'),
+        Show.start_time
+    ).join(Show, Show.artist_id == Artist.id) \
+        .filter(Show.venue_id == venue_id)
+
+    return {
+        **venue._asdict(),
+        **profile_shows(venue_shows, Show.venue_id, venue_id)
+    }
+
+
+def artist_profile(artist_id):
+    artist = artist_row(artist_id)
+
+    # venue details of the artist's shows, split into upcoming/past in SQL
+    artist_shows = db.session.query(
+        Venue.id.label('venue_id'),
+        Venue.name.label('venue_name'),
+        Venue.image_link.label('venue_image_link'),
+        Show.start_time
+    ).join(Show, Show.venue_id == Venue.id) \
+        .filter(Show.artist_id == artist_id)
+
+    return {
+        **artist._asdict(),
+        **profile_shows(artist_shows, Show.artist_id, artist_id)
+    }
+
+
+#  Profile cache
+#  ----------------------------------------------------------------
+
+def venue_cache_key(venue_id):
+    return 'venue:{}'.format(venue_id)
+
+
+def artist_cache_key(artist_id):
+    return 'artist:{}'.format(artist_id)
+
+
+def venue_cache_keys(venue_id):
+    # the venue's own page plus every artist page that lists one of its shows
+    artist_ids = db.session.query(Show.artist_id).filter(Show.venue_id == venue_id).distinct()
+    return [venue_cache_key(venue_id)] + [artist_cache_key(a.artist_id) for a in artist_ids]
+
+
+def artist_cache_keys(artist_id):
+    venue_ids = db.session.query(Show.venue_id).filter(Show.artist_id == artist_id).distinct()
+    return [artist_cache_key(artist_id)] + [venue_cache_key(v.venue_id) for v in venue_ids]
+
+
+def cached_venue_profile(venue_id):
+    return get_or_set(current_app.extensions['profile_cache'], venue_cache_key(venue_id),
+                      lambda: venue_profile(venue_id))
+
+
+def cached_artist_profile(artist_id):
+    return get_or_set(current_app.extensions['profile_cache'], artist_cache_key(artist_id),
+                      lambda: artist_profile(artist_id))
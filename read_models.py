@@ -0,0 +1,53 @@
+from collections import namedtuple
+
+from flask import abort
+from sqlalchemy import bindparam, select
+
+from model import db, Venue, Artist
+
+# Read-only views get plain immutable rows from column-projected selects:
+# no ORM instances, identity map entries or attribute instrumentation. The
+# statements are Core selects built once at import. Row fields are the
+# column names; form_data() renames them to the form field names where the
+# two differ.
+
+VENUE_FIELDS = ('id', 'name', 'genres', 'address', 'city', 'state', 'area_id', 'phone', 'website',
+                'facebook_link', 'seeking_talent', 'seeking_description', 'image_link')
+VenueRow = namedtuple('VenueRow', VENUE_FIELDS)
+
+ARTIST_FIELDS = ('id', 'name', 'genres', 'city', 'state', 'area_id', 'phone', 'website',
+                 'facebook_link', 'seeking_venue', 'seeking_description', 'image_link')
+ArtistRow = namedtuple('ArtistRow', ARTIST_FIELDS)
+
+
+def by_id(table, fields):
+    columns = [table.c[name] for name in fields]
+    return select(*columns).where(table.c.id == bindparam('id'))
+
+
+VENUE_BY_ID = by_id(Venue.__table__, VENUE_FIELDS)
+ARTIST_BY_ID = by_id(Artist.__table__, ARTIST_FIELDS)
+
+# model column -> form field, where VenueForm/ArtistForm name it differently
+FORM_FIELD_NAMES = {'website': 'website_link'}
+
+
+def load_row(row_type, statement, entity_id):
+    # 404 when there is no such row
+    row = db.session.execute(statement, {'id': entity_id}).first()
+    if row is None:
+        abort(404)
+    return row_type._make(row)
+
+
+def venue_row(venue_id):
+    return load_row(VenueRow, VENUE_BY_ID, venue_id)
+
+
+def artist_row(artist_id):
+    return load_row(ArtistRow, ARTIST_BY_ID, artist_id)
+
+
+def form_data(row):
+    # `data=` for VenueForm/ArtistForm, e.g. VenueForm(data=form_data(row))
+    return {FORM_FIELD_NAMES.get(name, name): value for name, value in row._asdict().items()}
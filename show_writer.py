@@ -0,0 +1,233 @@
+import logging
+import queue
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from sqlalchemy import select, tuple_
+from sqlalchemy.exc import IntegrityError
+
+from counters import count_new_show, refresh_counters
+from model import db, Venue, Artist, Show
+from queries import venue_cache_key, artist_cache_key
+
+# The show write path. Every show is checked with one query (venue exists,
+# artist exists, the venue has no show at that start time); the unique
+# constraint on Shows(venue_id, start_time) catches a slot taken by a
+# concurrent request between that check and the commit.
+#
+# With SHOW_WRITE_MODE = 'queued', submissions are handed to a background
+# thread that inserts them in batched transactions and the client gets a
+# ticket to poll instead of waiting for its own commit.
+
+log = logging.getLogger(__name__)
+
+SLOT_TAKEN = 'the venue already has a show at that time'
+
+
+class ShowRejected(ValueError):
+    """Raised with form-style errors ({field: [message]}) for a show that
+    cannot be listed."""
+
+    def __init__(self, errors):
+        super().__init__(errors)
+        self.errors = errors
+
+
+def check_show(venue_id, artist_id, start_time):
+    # the three checks in a single round trip
+    venue_exists, artist_exists, slot_taken = db.session.execute(select(
+        select(Venue.id).where(Venue.id == venue_id).exists(),
+        select(Artist.id).where(Artist.id == artist_id).exists(),
+        select(Show.id).where(Show.venue_id == venue_id, Show.start_time == start_time).exists(),
+    )).one()
+    errors = {}
+    if not venue_exists:
+        errors['venue_id'] = ['unknown venue']
+    if not artist_exists:
+        errors['artist_id'] = ['unknown artist']
+    if slot_taken:
+        errors['start_time'] = [SLOT_TAKEN]
+    return errors
+
+
+def evict_profiles(cache, venue_ids, artist_ids):
+    cache.delete_many(*[venue_cache_key(i) for i in venue_ids] +
+                      [artist_cache_key(i) for i in artist_ids])
+
+
+def create_show(cache, venue_id, artist_id, start_time):
+    """Insert one show and commit; raises ShowRejected."""
+    errors = check_show(venue_id, artist_id, start_time)
+    if errors:
+        raise ShowRejected(errors)
+    show = Show(venue_id=venue_id, artist_id=artist_id, start_time=start_time)
+    db.session.add(show)
+    try:
+        db.session.flush()
+        show_id = show.id
+        count_new_show(venue_id, artist_id, start_time)
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        raise ShowRejected({'start_time': [SLOT_TAKEN]})
+    evict_profiles(cache, [venue_id], [artist_id])
+    return show_id
+
+
+def taken_slots(slots):
+    # the (venue_id, start_time) pairs among `slots` that already have a show
+    return set(db.session.execute(
+        select(Show.venue_id, Show.start_time)
+        .where(tuple_(Show.venue_id, Show.start_time).in_(list(slots)))).all())
+
+
+def check_batch(items):
+    # the same checks for a whole batch, one query per table; a slot asked
+    # for twice within the batch goes to the first submission
+    venue_ids = {i['venue_id'] for i in items}
+    artist_ids = {i['artist_id'] for i in items}
+    slots = {(i['venue_id'], i['start_time']) for i in items}
+    known_venues = set(db.session.scalars(select(Venue.id).where(Venue.id.in_(venue_ids))))
+    known_artists = set(db.session.scalars(select(Artist.id).where(Artist.id.in_(artist_ids))))
+    taken = taken_slots(slots)
+
+    accepted, rejected = [], []
+    for item in items:
+        slot = (item['venue_id'], item['start_time'])
+        if item['venue_id'] not in known_venues:
+            rejected.append((item, {'venue_id': ['unknown venue']}))
+        elif item['artist_id'] not in known_artists:
+            rejected.append((item, {'artist_id': ['unknown artist']}))
+        elif slot in taken:
+            rejected.append((item, {'start_time': [SLOT_TAKEN]}))
+        else:
+            taken.add(slot)
+            accepted.append(item)
+    return accepted, rejected
+
+
+def insert_batch(cache, items):
+    """Insert a batch of shows in one transaction.
+
+    Returns [(item, show_id or None, errors or None)]. If the batch loses a
+    slot to a concurrent writer the transaction is rolled back and the items
+    are retried one by one, so one conflict does not reject the rest.
+    """
+    accepted, rejected = check_batch(items)
+    results = [(item, None, errors) for item, errors in rejected]
+    if not accepted:
+        return results
+    shows = [Show(venue_id=i['venue_id'], artist_id=i['artist_id'], start_time=i['start_time'])
+             for i in accepted]
+    db.session.add_all(shows)
+    try:
+        db.session.flush()
+        show_ids = [s.id for s in shows]
+        venue_ids = {s.venue_id for s in shows}
+        artist_ids = {s.artist_id for s in shows}
+        refresh_counters(venue_ids, artist_ids)
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        for item in accepted:
+            try:
+                results.append((item, create_show(cache, item['venue_id'], item['artist_id'],
+                                                  item['start_time']), None))
+            except ShowRejected as err:
+                results.append((item, None, err.errors))
+        return results
+    evict_profiles(cache, venue_ids, artist_ids)
+    return results + [(item, show_id, None) for item, show_id in zip(accepted, show_ids)]
+
+
+class ShowWriter:
+    """Background writer for SHOW_WRITE_MODE = 'queued'.
+
+    `submit` returns a ticket at once; the writer thread takes up to
+    `batch_size` submissions, or whatever arrived within `max_delay` seconds
+    of the first one, and inserts them with insert_batch. Ticket outcomes
+    are kept in memory (the last `max_tickets`), so they can only be read
+    back from the process that accepted the submission.
+    """
+
+    def __init__(self, app, batch_size=100, max_delay=0.05, max_tickets=10000):
+        self.app = app
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        self.max_tickets = max_tickets
+        self._queue = queue.Queue()
+        self._tickets = OrderedDict()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def _set(self, ticket, status):
+        with self._lock:
+            self._tickets[ticket] = status
+            self._tickets.move_to_end(ticket)
+            while len(self._tickets) > self.max_tickets:
+                self._tickets.popitem(last=False)
+
+    def status(self, ticket):
+        with self._lock:
+            return self._tickets.get(ticket)
+
+    def submit(self, venue_id, artist_id, start_time):
+        self._ensure_started()
+        ticket = uuid.uuid4().hex
+        self._set(ticket, {'status': 'pending'})
+        self._queue.put({'ticket': ticket, 'venue_id': venue_id,
+                         'artist_id': artist_id, 'start_time': start_time})
+        return ticket
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='show-writer', daemon=True)
+                self._thread.start()
+
+    def _next_batch(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_delay
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            with self.app.app_context():
+                try:
+                    results = insert_batch(self.app.extensions['profile_cache'], batch)
+                except Exception:
+                    log.exception('show writer: batch of %d failed', len(batch))
+                    db.session.rollback()
+                    results = [(item, None, {'show': ['could not be saved']}) for item in batch]
+                finally:
+                    db.session.remove()
+            for item, show_id, errors in results:
+                if errors:
+                    self._set(item['ticket'], {'status': 'rejected', 'errors': errors})
+                else:
+                    self._set(item['ticket'], {'status': 'created', 'show_id': show_id})
+            for _ in batch:
+                self._queue.task_done()
+
+    def join(self):
+        # block until everything submitted so far has been written
+        self._queue.join()
+
+
+def init_show_writer(app):
+    if app.config.get('SHOW_WRITE_MODE') == 'queued':
+        app.extensions['show_writer'] = ShowWriter(
+            app,
+            batch_size=app.config.get('SHOW_QUEUE_BATCH_SIZE', 100),
+            max_delay=app.config.get('SHOW_QUEUE_MAX_DELAY_MS', 50) / 1000.0)
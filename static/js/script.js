@@ -2,3 +2,37 @@ window.parseISOString = function parseISOString(s) {
   var b = s.split(/\D+/);
   return new Date(Date.UTC(b[0], --b[1], b[2], b[3], b[4], b[5], b[6]));
 };
+
+// Type-ahead pickers: an <input data-lookup="artist|venue" list="..."> gets
+// its <datalist> filled from /api/lookup while typing. Option values are ids,
+// labels are names.
+document.querySelectorAll('input[data-lookup]').forEach(function (input) {
+  var list = document.getElementById(input.getAttribute('list'));
+  var timer = null;
+  var lastTerm = null;
+
+  function refresh() {
+    var term = /^\d+$/.test(input.value) ? '' : input.value;
+    if (term === lastTerm) return;
+    lastTerm = term;
+    var url = '/api/lookup?kind=' + encodeURIComponent(input.dataset.lookup) +
+      '&q=' + encodeURIComponent(term);
+    fetch(url)
+      .then(function (response) { return response.json(); })
+      .then(function (body) {
+        list.innerHTML = '';
+        body.data.forEach(function (row) {
+          var option = document.createElement('option');
+          option.value = row.id;
+          option.textContent = row.name;
+          list.appendChild(option);
+        });
+      });
+  }
+
+  input.addEventListener('focus', refresh);
+  input.addEventListener('input', function () {
+    clearTimeout(timer);
+    timer = setTimeout(refresh, 150);
+  });
+});
@@ -0,0 +1,63 @@
+import os
+import stat
+import time
+
+from jinja2 import FileSystemBytecodeCache, MemcachedBytecodeCache
+
+# Without help every worker compiles each template on the first request that
+# renders it. Compiled templates are kept in a Jinja bytecode cache shared by
+# all workers and restarts, and init_templates compiles everything under
+# templates/ at startup so no request pays for it.
+
+
+def private_directory(directory):
+    # the cache is loaded with marshal, so whoever can write to the directory
+    # can run code in the app: it must be ours and closed to everyone else
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+    st = os.lstat(directory)
+    if not stat.S_ISDIR(st.st_mode):
+        raise RuntimeError('template bytecode cache {} is not a directory'.format(directory))
+    if hasattr(os, 'getuid') and st.st_uid != os.getuid():
+        raise RuntimeError('template bytecode cache {} is owned by another user'.format(directory))
+    if st.st_mode & 0o077:
+        os.chmod(directory, 0o700)
+    return directory
+
+
+def make_bytecode_cache(config):
+    cache_type = config.get('TEMPLATE_BYTECODE_CACHE')
+    if not cache_type:
+        return None
+    if cache_type == 'filesystem':
+        directory = config.get('TEMPLATE_BYTECODE_CACHE_DIR')
+        if not directory:
+            # Jinja's own per-user directory, created 0700 and checked for
+            # ownership on every start
+            return FileSystemBytecodeCache()
+        return FileSystemBytecodeCache(private_directory(directory))
+    if cache_type == 'memcached':
+        # optional dependency, only needed for TEMPLATE_BYTECODE_CACHE = 'memcached'
+        from pymemcache.client.hash import HashClient
+        client = HashClient(list(config['TEMPLATE_BYTECODE_CACHE_SERVERS']))
+        return MemcachedBytecodeCache(client, prefix='fyyur/jinja/')
+    raise ValueError('unknown TEMPLATE_BYTECODE_CACHE: {!r}'.format(cache_type))
+
+
+def precompile_templates(app):
+    # loads every template into the environment's in-process cache, reading
+    # from (or filling) the bytecode cache on the way
+    env = app.jinja_env
+    started = time.perf_counter()
+    names = env.list_templates(extensions=['html'])
+    for name in names:
+        env.get_template(name)
+    return len(names), time.perf_counter() - started
+
+
+def init_templates(app):
+    # call once every filter and global is registered: compiling a template
+    # that uses an unknown filter fails
+    app.jinja_env.bytecode_cache = make_bytecode_cache(app.config)
+    if app.config.get('TEMPLATE_PRECOMPILE'):
+        count, elapsed = precompile_templates(app)
+        app.logger.info('precompiled %d templates in %.0f ms', count, elapsed * 1000)
@@ -0,0 +1,60 @@
+import os
+import tempfile
+from datetime import datetime, timedelta
+
+# config.py reads the environment when app is imported, so this comes first:
+# a throwaway SQLite database and the test profile (lazy loads raise)
+DB_DIR = tempfile.mkdtemp(prefix='fyyur-tests-')
+os.environ['FYYUR_ENV'] = 'test'
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(DB_DIR, 'fyyur.db')
+
+import pytest
+
+from app import app as flask_app
+from areas import backfill_areas
+from counters import refresh_counters
+from model import db, Venue, Artist, Show
+
+CITIES = (('San Francisco', 'CA'), ('New York', 'NY'), ('Austin', 'TX'))
+
+
+def seed_catalog(venues=12, artists=12, shows=48):
+    # enough rows per area and per venue that a query per row would show
+    now = datetime.now().replace(minute=0, second=0, microsecond=0)
+    for i in range(venues):
+        city, state = CITIES[i % len(CITIES)]
+        db.session.add(Venue(name='Venue {}'.format(i), city=city, state=state,
+                             address='{} Main St'.format(i), genres=['Jazz', 'Blues'][:1 + i % 2]))
+    for i in range(artists):
+        city, state = CITIES[i % len(CITIES)]
+        db.session.add(Artist(name='Artist {}'.format(i), city=city, state=state,
+                              genres=['Rock n Roll', 'Folk'][:1 + i % 2]))
+    db.session.flush()
+    venue_ids = [v.id for v in Venue.query.order_by(Venue.id)]
+    artist_ids = [a.id for a in Artist.query.order_by(Artist.id)]
+    for i in range(shows):
+        db.session.add(Show(venue_id=venue_ids[i % venues], artist_id=artist_ids[(i * 7) % artists],
+                            start_time=now + timedelta(days=i - shows // 2)))
+    db.session.flush()
+    backfill_areas(db.session.connection())
+    refresh_counters()
+    db.session.commit()
+
+
+@pytest.fixture
+def app():
+    flask_app.config.update(WTF_CSRF_ENABLED=False, QUERY_STATS_HEADERS=False)
+    with flask_app.app_context():
+        db.drop_all()
+        db.create_all()
+        flask_app.extensions['profile_cache'].clear()
+        flask_app.extensions['lookup_cache'].clear()
+        flask_app.extensions['facet_cache'].clear()
+        seed_catalog()
+        yield flask_app
+        db.session.remove()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
@@ -0,0 +1,56 @@
+from datetime import datetime, timedelta, timezone
+
+from model import db, Venue, Artist, Show
+
+
+def test_lookup_has_its_own_cache(app, client):
+    profile_cache = app.extensions['profile_cache']
+    lookup_cache = app.extensions['lookup_cache']
+    assert client.get('/venues/1').status_code == 200
+    profiles = profile_cache.stats()
+
+    for prefix in ('V', 'Ve', 'Ven', 'Venu', 'Venue'):
+        response = client.get('/api/lookup', query_string={'kind': 'venue', 'q': prefix})
+        assert response.status_code == 200
+    assert response.json['data']
+
+    assert profile_cache.stats() == profiles
+    assert lookup_cache.stats()['misses'] == 5
+
+
+def test_profile_last_modified(app, client):
+    # venue 1 with a single, upcoming show, and every row last changed in
+    # the past
+    show_id = db.session.query(Show.id).filter(Show.venue_id == 1).order_by(Show.id).first().id
+    db.session.execute(Show.__table__.delete().where(Show.venue_id == 1, Show.id != show_id))
+    db.session.execute(Show.__table__.update().where(Show.id == show_id)
+                       .values(start_time=datetime.now() + timedelta(days=30)))
+    past = datetime(2026, 1, 1, 12, 0, 0)
+    for model in (Venue, Artist, Show):
+        db.session.execute(model.__table__.update().values(updated_at=past))
+    db.session.commit()
+
+    response = client.get('/api/v1/venues/1')
+    assert response.last_modified == past.replace(tzinfo=timezone.utc)
+    header = response.headers['Last-Modified']
+    assert client.get('/api/v1/venues/1', headers={'If-Modified-Since': header}).status_code == 304
+    # If-None-Match decides when both are sent
+    assert client.get('/api/v1/venues/1', headers={
+        'If-Modified-Since': header, 'If-None-Match': '"stale"'}).status_code == 200
+
+    # a show moving from upcoming to past changes the page at its start time
+    started = datetime(2026, 2, 1, 20, 0, 0)
+    db.session.execute(Show.__table__.update().where(Show.id == show_id)
+                       .values(start_time=started, updated_at=past))
+    db.session.commit()
+    response = client.get('/api/v1/venues/1', headers={'If-Modified-Since': header})
+    assert response.status_code == 200
+    assert response.last_modified == started.replace(tzinfo=timezone.utc)
+
+
+def test_no_last_modified_within_the_current_second(client):
+    # seeded this second: a later change in the same second would carry
+    # the same HTTP date
+    response = client.get('/api/v1/shows/1')
+    assert response.status_code == 200
+    assert 'Last-Modified' not in response.headers
@@ -0,0 +1,71 @@
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+from model import db, Venue, Artist, Show
+
+START = datetime(2026, 1, 1, 12, 0, 0)
+KINDS = (('venue', Venue), ('artist', Artist), ('show', Show))
+
+
+@pytest.fixture
+def history(app):
+    # every row last changed in one of three seconds, several per second, so
+    # pages break inside a run of equal timestamps; one in four was updated
+    # after it was created
+    for kind, model in KINDS:
+        for entity_id, in db.session.query(model.id):
+            updated_at = START + timedelta(seconds=entity_id % 3)
+            created_at = updated_at - timedelta(days=1) if entity_id % 4 == 0 else updated_at
+            db.session.execute(model.__table__.update().where(model.__table__.c.id == entity_id)
+                               .values(created_at=created_at, updated_at=updated_at))
+    db.session.commit()
+    return {(kind, entity_id): START + timedelta(seconds=entity_id % 3)
+            for kind, model in KINDS for entity_id, in db.session.query(model.id)}
+
+
+def walk(client, **params):
+    rows, params = [], dict(params, limit=7)
+    while True:
+        page = client.get('/api/changes', query_string=params).json
+        rows.extend(page['data'])
+        if not page['next_cursor']:
+            return rows
+        params['after'] = page['next_cursor']
+
+
+def test_feed_pages_through_every_change_once(client, history):
+    rows = walk(client)
+    assert [(row['type'], row['id']) for row in rows] == \
+        sorted(history, key=lambda change: (history[change], change))
+    assert {row['action'] for row in rows if row['id'] % 4 == 0} == {'updated'}
+    assert {row['action'] for row in rows if row['id'] % 4 != 0} == {'created'}
+
+
+def test_feed_since(client, history):
+    since = START + timedelta(seconds=1)
+    rows = walk(client, since=since.isoformat())
+    assert {(row['type'], row['id']) for row in rows} == \
+        {change for change, updated_at in history.items() if updated_at > since}
+    # a watermark carrying microseconds still compares with stored seconds
+    assert walk(client, since=(since - timedelta(microseconds=1)).isoformat()) == \
+        walk(client, since=START.isoformat())
+
+
+def test_feed_holds_back_unsettled_changes(client, history):
+    venue = db.session.get(Venue, 1)
+    venue.phone = '555-0100'
+    db.session.commit()
+    changes = {(row['type'], row['id']) for row in walk(client)}
+    assert ('venue', 1) not in changes
+    assert len(changes) == len(history) - 1
+
+
+def test_export_since(app, history):
+    since = START + timedelta(seconds=1)
+    result = app.test_cli_runner().invoke(args=['export', 'shows', '--since', since.isoformat()])
+    assert result.exit_code == 0, result.output
+    ids = [json.loads(line)['id'] for line in result.output.splitlines()]
+    assert ids == sorted(show_id for (kind, show_id), updated_at in history.items()
+                         if kind == 'show' and updated_at > since)
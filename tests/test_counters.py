@@ -0,0 +1,28 @@
+from datetime import datetime
+
+from counters import refresh_counters
+from model import db, Venue, Artist
+
+LONG_AGO = datetime(2000, 1, 1)
+
+
+def test_refresh_only_touches_drifted_rows(app):
+    for model in (Venue, Artist):
+        db.session.query(model).update({model.updated_at: LONG_AGO}, synchronize_session=False)
+    db.session.query(Venue).filter(Venue.id == 1).update(
+        {Venue.upcoming_shows_count: 99}, synchronize_session=False)
+    db.session.commit()
+
+    assert refresh_counters() == 1
+    db.session.commit()
+
+    changed = [v.id for v in Venue.query.filter(Venue.updated_at != LONG_AGO)]
+    assert changed == [1]
+    assert Venue.query.get(1).upcoming_shows_count != 99
+    assert Artist.query.filter(Artist.updated_at != LONG_AGO).count() == 0
+    assert refresh_counters() == 0
+
+
+def test_rebuild_command_leaves_correct_counters_alone(app):
+    result = app.test_cli_runner().invoke(args=['counters', 'rebuild'])
+    assert '0 venues and artists changed' in result.output
@@ -0,0 +1,21 @@
+import json
+
+from model import db, Show
+
+
+def test_import_rejects_taken_slots(app, tmp_path):
+    taken = db.session.query(Show.venue_id, Show.start_time).first()
+    path = tmp_path / 'shows.csv'
+    path.write_text('venue_id,artist_id,start_time\n'
+                    '1,1,2030-01-01 20:00:00\n'
+                    '1,2,2030-01-01 20:00:00\n'
+                    '{},1,{:%Y-%m-%d %H:%M:%S}\n'.format(taken.venue_id, taken.start_time))
+    before = Show.query.count()
+
+    result = app.test_cli_runner().invoke(args=['import', 'shows', str(path)])
+
+    assert result.exception is None, result.output
+    assert Show.query.count() == before + 1
+    rejects = [json.loads(line) for line in open(str(path) + '.rejects.ndjson')]
+    assert [r['line'] for r in rejects] == [3, 4]
+    assert all(list(r['errors']) == ['start_time'] for r in rejects)
@@ -0,0 +1,80 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy import event
+
+from counters import _actual_counts
+from model import db, Venue, Artist, Show
+
+
+def query_plan(statement):
+    # SQLite's EXPLAIN QUERY PLAN of `statement`, with the same bound parameters
+    connection = db.session.connection()
+
+    def explain(conn, cursor, sql, parameters, context, executemany):
+        return 'EXPLAIN QUERY PLAN ' + sql, parameters
+
+    event.listen(connection, 'before_cursor_execute', explain, retval=True)
+    try:
+        return '\n'.join(row[3] for row in connection.execute(statement).cursor.fetchall())
+    finally:
+        event.remove(connection, 'before_cursor_execute', explain)
+
+
+def index_name(name):
+    # SQLite names the index behind a UNIQUE constraint sqlite_autoindex_*;
+    # find it by its columns
+    table = Show.__table__
+    constraint = next((c for c in table.constraints if c.name == name), None)
+    if constraint is None:
+        return name
+    columns = [c.name for c in constraint.columns]
+    connection = db.session.connection()
+    for row in connection.exec_driver_sql('PRAGMA index_list("{}")'.format(table.name)):
+        info = connection.exec_driver_sql('PRAGMA index_info("{}")'.format(row[1])).all()
+        if [i[2] for i in info] == columns:
+            return row[1]
+    raise AssertionError('no index backs {}'.format(name))
+
+
+def profile_statement(fk_column, entity_id):
+    # the upcoming half of queries.profile_shows, joined to the other side
+    # of the show as venue_profile/artist_profile do
+    other = Artist if fk_column is Show.venue_id else Venue
+    other_fk = Show.artist_id if other is Artist else Show.venue_id
+    return db.select(other.id, other.name, Show.start_time) \
+        .join(Show, other_fk == other.id) \
+        .where(fk_column == entity_id, Show.start_time > datetime.now()) \
+        .order_by(Show.start_time, Show.id).limit(12)
+
+
+def profile_counts_statement(fk_column, entity_id):
+    now = datetime.now()
+    return db.select(db.func.count(db.case((Show.start_time > now, Show.id))),
+                     db.func.count(db.case((Show.start_time <= now, Show.id)))) \
+        .where(fk_column == entity_id)
+
+
+def upcoming_counts_statement(model, fk_column):
+    # the correlated counts refresh_counters writes into upcoming_shows_count
+    upcoming, past = _actual_counts(model, fk_column, datetime.now())
+    return db.select(model.id, upcoming, past)
+
+
+@pytest.mark.parametrize('fk_column, index', [
+    (Show.venue_id, 'uq_Shows_venue_id_start_time'),
+    (Show.artist_id, 'ix_Shows_artist_id_start_time'),
+])
+def test_profile_queries_use_the_show_indexes(app, fk_column, index):
+    expected = index_name(index)
+    assert expected in query_plan(profile_statement(fk_column, 1))
+    assert expected in query_plan(profile_counts_statement(fk_column, 1))
+
+
+@pytest.mark.parametrize('model, fk_column, index', [
+    (Venue, Show.venue_id, 'uq_Shows_venue_id_start_time'),
+    (Artist, Show.artist_id, 'ix_Shows_artist_id_start_time'),
+])
+def test_upcoming_counts_use_the_show_indexes(app, model, fk_column, index):
+    plan = query_plan(upcoming_counts_statement(model, fk_column))
+    assert 'SEARCH Shows USING COVERING INDEX {}'.format(index_name(index)) in plan
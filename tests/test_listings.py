@@ -0,0 +1,43 @@
+from datetime import datetime
+
+from metrics import assert_query_budget
+from model import db, Venue
+from queries import filter_genres, genre_facets
+
+
+def test_venues_query_budget(client):
+    # page version, the grouped listing and its genre facets; a query per
+    # area or per venue would blow this
+    response = assert_query_budget(client, '/venues', 3)
+    assert response.status_code == 200
+    assert b'Venue 11' in response.data
+
+
+def test_venues_facets_come_from_the_cache(app, client):
+    # seeded this second; an edit has to move max(updated_at), which SQLite
+    # keeps in whole seconds
+    db.session.execute(Venue.__table__.update().values(updated_at=datetime(2026, 1, 1)))
+    db.session.commit()
+    assert_query_budget(client, '/venues', 3)
+    # the page version and the listing; the facet aggregate is reused
+    response = assert_query_budget(client, '/venues', 2)
+    assert b'Blues (6)' in response.data
+    assert app.extensions['facet_cache'].stats()['hits'] == 1
+
+    venue = db.session.get(Venue, 2)
+    assert venue.genres == ['Jazz', 'Blues']
+    venue.genres = ['Jazz']
+    db.session.commit()
+    response = client.get('/venues')
+    assert b'Blues (5)' in response.data
+
+
+def test_genre_facets_over_json_lists(app):
+    # SQLite keeps genres as JSON, counted through json_each()
+    venues = db.session.query(Venue.id, Venue.genres)
+    assert genre_facets(venues, Venue.genres) == [('Jazz', 12), ('Blues', 6)]
+    blues = filter_genres(venues, Venue.genres, ['Blues'])
+    assert blues.count() == 6
+    assert genre_facets(blues, Venue.genres, ['Blues']) == [('Blues', 6), ('Jazz', 6)]
+    assert genre_facets(filter_genres(venues, Venue.genres, ['Folk']), Venue.genres, ['Folk']) == \
+        [('Folk', 0)]
@@ -0,0 +1,32 @@
+import pytest
+from sqlalchemy.exc import InvalidRequestError
+
+from loading import VENUE_WITH_SHOWS, ARTIST_WITH_SHOWS, SHOW_WITH_VENUE_AND_ARTIST
+from metrics import count_queries
+from model import db, Venue, Artist, Show
+
+
+def test_venue_with_shows(app):
+    db.session.expunge_all()
+    with count_queries() as stats:
+        venue = Venue.query.options(*VENUE_WITH_SHOWS).get(1)
+        shows = venue.shows
+        # the back-reference is the venue itself, already in the identity map
+        assert all(show.venue is venue for show in shows)
+        assert all(show.artist.name for show in shows)
+    assert shows and stats.count == 2
+
+
+def test_artist_with_shows(app):
+    db.session.expunge_all()
+    with count_queries() as stats:
+        artist = Artist.query.options(*ARTIST_WITH_SHOWS).get(1)
+        assert all(show.artist is artist and show.venue.name for show in artist.shows)
+    assert artist.shows and stats.count == 2
+
+
+def test_unnamed_relationships_raise_instead_of_querying(app):
+    db.session.expunge_all()
+    show = Show.query.options(*SHOW_WITH_VENUE_AND_ARTIST).first()
+    with pytest.raises(InvalidRequestError):
+        show.venue.shows
@@ -0,0 +1,33 @@
+import pytest
+
+from metrics import UNMATCHED, request_metrics
+
+
+@pytest.fixture
+def stats_token(app):
+    app.config['INTERNAL_STATS_TOKEN'] = 's3cret'
+    yield
+    app.config['INTERNAL_STATS_TOKEN'] = None
+
+
+def test_unmatched_requests_are_recorded_under_a_fixed_key(client, stats_token):
+    assert client.get('/no/such/page').status_code == 404
+    assert client.get('/venues').status_code == 200
+    snapshot = request_metrics.snapshot()
+    assert UNMATCHED in snapshot and None not in snapshot
+
+    response = client.get('/internal/stats', headers={'Authorization': 'Bearer s3cret'})
+    assert response.status_code == 200
+    assert UNMATCHED in response.json['endpoints']
+
+
+
+def test_internal_stats_is_off_without_a_token(client):
+    assert client.get('/internal/stats').status_code == 404
+
+
+def test_internal_stats_needs_the_token(client, stats_token):
+    # the test client comes from 127.0.0.1, like every request behind a proxy
+    assert client.get('/internal/stats').status_code == 401
+    assert client.get('/internal/stats', headers={'Authorization': 'Bearer nope'}).status_code == 401
+    assert client.get('/internal/stats', headers={'Authorization': 'Bearer s3cret'}).status_code == 200
@@ -0,0 +1,114 @@
+import os
+import subprocess
+import sys
+
+import pytest
+import sqlalchemy as sa
+from alembic.autogenerate import compare_metadata
+from alembic.migration import MigrationContext
+
+from model import db
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE = '4f1c0a6e2b10'
+
+
+def flask_db(url, *args, check=True):
+    # `flask db ...` in a process of its own, so the migrations run against
+    # their own database and not the one the app fixture uses
+    env = dict(os.environ, FLASK_APP='app', FYYUR_ENV='test', DATABASE_URL=url)
+    result = subprocess.run([sys.executable, '-m', 'flask', 'db'] + list(args), cwd=ROOT,
+                            env=env, capture_output=True, text=True)
+    if check:
+        assert result.returncode == 0, result.stderr
+    return result
+
+
+@pytest.fixture
+def database(tmp_path):
+    url = 'sqlite:///' + str(tmp_path / 'migrated.db')
+    engine = sa.create_engine(url)
+    yield url, engine
+    engine.dispose()
+
+
+def index_names(engine, table):
+    return {ix['name'] for ix in sa.inspect(engine).get_indexes(table)}
+
+
+def seed_baseline(engine):
+    # rows as the pre-migrations app wrote them
+    with engine.begin() as connection:
+        connection.execute(sa.text(
+            "INSERT INTO \"Venue\" (id, name, city, state, genres) "
+            "VALUES (1, 'The Musical Hop', 'san francisco', 'ca', '[\"Jazz\"]')"))
+        connection.execute(sa.text(
+            "INSERT INTO \"Artist\" (id, name, city, state, seeking_venue, genres) "
+            "VALUES (1, 'Guns N Petals', 'San Francisco', 'CA', 0, '[\"Rock n Roll\"]')"))
+        connection.execute(sa.text(
+            "INSERT INTO \"Shows\" (id, venue_id, artist_id, start_time, updated_datetime) "
+            "VALUES (1, 1, 1, '2019-05-21 21:30:00.000000', '2019-05-01 00:00:00.000000'), "
+            "(2, 1, 1, '2035-04-01 20:00:00.000000', '2019-06-01 00:00:00.000000')"))
+
+
+def test_head_matches_models(database):
+    url, engine = database
+    flask_db(url, 'upgrade')
+    with engine.connect() as connection:
+        assert compare_metadata(MigrationContext.configure(connection), db.metadata) == []
+
+
+def test_upgrade_from_baseline_keeps_rows(database):
+    url, engine = database
+    flask_db(url, 'upgrade', BASELINE)
+    seed_baseline(engine)
+    flask_db(url, 'upgrade')
+
+    for table in ('Venue', 'Artist'):
+        expected = ('ix_{}_name_trgm', 'ix_{}_name', 'ix_{}_area_id_name', 'ix_{}_genres')
+        assert {name.format(table) for name in expected} <= index_names(engine, table)
+    assert {'ix_Shows_artist_id_start_time', 'ix_Shows_updated_at_id'} <= index_names(engine, 'Shows')
+    assert [c['name'] for c in sa.inspect(engine).get_unique_constraints('Shows')] == \
+        ['uq_Shows_venue_id_start_time']
+    with engine.connect() as connection:
+        assert connection.execute(sa.text('SELECT count(*) FROM "Shows"')).scalar() == 2
+        # counters start out matching the shows
+        for table in ('Venue', 'Artist'):
+            assert connection.execute(sa.text(
+                'SELECT upcoming_shows_count, past_shows_count FROM "{}"'.format(table))).one() == (1, 1)
+        assert connection.execute(sa.text('SELECT version_id FROM "Shows"')).scalars().all() == [1, 1]
+        # the old updated_datetime values survive the rename
+        assert connection.execute(sa.text(
+            'SELECT created_at, updated_at FROM "Shows" ORDER BY id')).all() == [
+            ('2019-05-01 00:00:00', '2019-05-01 00:00:00'),
+            ('2019-06-01 00:00:00', '2019-06-01 00:00:00')]
+        assert connection.execute(sa.text(
+            'SELECT count(*) FROM "Venue" WHERE created_at IS NOT NULL AND updated_at IS NOT NULL')).scalar() == 1
+        # both spellings of San Francisco end up in one area
+        assert connection.execute(sa.text('SELECT city, state FROM "Area"')).all() == [('San Francisco', 'CA')]
+        assert connection.execute(sa.text(
+            'SELECT city, state, area_id, version_id FROM "Venue"')).one() == ('San Francisco', 'CA', 1, 2)
+        assert connection.execute(sa.text('SELECT area_id FROM "Artist"')).scalar() == 1
+
+
+def test_upgrade_stops_on_double_booked_venue(database):
+    url, engine = database
+    flask_db(url, 'upgrade', BASELINE)
+    seed_baseline(engine)
+    with engine.begin() as connection:
+        connection.execute(sa.text(
+            "INSERT INTO \"Shows\" (id, venue_id, artist_id, start_time) "
+            "VALUES (3, 1, 1, '2035-04-01 20:00:00.000000')"))
+
+    result = flask_db(url, 'upgrade', check=False)
+    assert result.returncode != 0
+    assert 'venue 1, 2035-04-01 20:00:00: 2 shows' in result.stderr
+    with engine.connect() as connection:
+        assert connection.execute(sa.text('SELECT count(*) FROM "Shows"')).scalar() == 3
+
+
+def test_downgrade_to_base(database):
+    url, engine = database
+    flask_db(url, 'upgrade')
+    flask_db(url, 'downgrade', 'base')
+    assert set(sa.inspect(engine).get_table_names()) == {'alembic_version'}
@@ -0,0 +1,39 @@
+import base64
+import json
+from datetime import datetime
+
+import pytest
+
+from pagination import decode_cursor, encode_cursor
+
+
+def crafted(payload):
+    raw = json.dumps(payload).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def test_cursor_round_trip():
+    values = ['CA', 'san francisco', 7, datetime(2030, 1, 1, 20, 0)]
+    assert decode_cursor(encode_cursor(values)) == values
+
+
+@pytest.mark.parametrize('cursor', [
+    'not base64!',
+    crafted({'a': 1}),
+    crafted([{'foo': 1}]),
+    crafted([{'dt': 5}]),
+    crafted([{'dt': 'yesterday'}]),
+    crafted([[1, 2]]),
+    crafted([]),
+    crafted([1]),
+])
+def test_malformed_cursors_are_a_400(client, cursor):
+    assert client.get('/venues', query_string={'after': cursor}).status_code == 400
+    assert client.get('/venues', query_string={'before': cursor}).status_code == 400
+
+
+def test_next_page_cursor_is_accepted(client):
+    response = client.get('/venues?limit=5')
+    assert b'after=' in response.data
+    cursor = response.data.split(b'after=')[1].split(b'"')[0].decode('ascii')
+    assert client.get('/venues', query_string={'after': cursor, 'limit': 5}).status_code == 200
@@ -0,0 +1,102 @@
+import re
+from datetime import datetime
+
+import pytest
+
+import show_writer
+from model import db, Venue, Show
+from show_writer import (SLOT_TAKEN, ShowRejected, check_show, create_show, init_show_writer,
+                         insert_batch)
+
+SLOT = datetime(2030, 1, 1, 20, 0)
+
+
+@pytest.fixture
+def taken(app):
+    # (venue_id, start_time) of a seeded show
+    return db.session.query(Show.venue_id, Show.start_time).first()
+
+
+def test_check_show(app, taken):
+    assert check_show(1, 1, SLOT) == {}
+    assert check_show(999, 998, SLOT) == {'venue_id': ['unknown venue'],
+                                          'artist_id': ['unknown artist']}
+    assert check_show(taken.venue_id, 1, taken.start_time) == {'start_time': [SLOT_TAKEN]}
+
+
+def test_create_show_rejects_taken_slot(app, taken):
+    cache = app.extensions['profile_cache']
+    upcoming = db.session.get(Venue, 1).upcoming_shows_count
+    show_id = create_show(cache, 1, 1, SLOT)
+    assert db.session.get(Show, show_id).start_time == SLOT
+    assert db.session.get(Venue, 1).upcoming_shows_count == upcoming + 1
+
+    with pytest.raises(ShowRejected) as rejected:
+        create_show(cache, taken.venue_id, 2, taken.start_time)
+    assert rejected.value.errors == {'start_time': [SLOT_TAKEN]}
+
+
+def test_insert_batch_checks_every_item(app, taken):
+    before = Show.query.count()
+    results = insert_batch(app.extensions['profile_cache'], [
+        {'venue_id': 1, 'artist_id': 1, 'start_time': SLOT},
+        {'venue_id': 1, 'artist_id': 2, 'start_time': SLOT},  # same slot, same batch
+        {'venue_id': 999, 'artist_id': 1, 'start_time': SLOT},
+        {'venue_id': taken.venue_id, 'artist_id': 1, 'start_time': taken.start_time},
+        {'venue_id': 2, 'artist_id': 2, 'start_time': SLOT},
+    ])
+    outcome = {(r[0]['venue_id'], r[0]['artist_id'], r[0]['start_time']): (r[1] is not None, r[2])
+               for r in results}
+
+    assert outcome == {
+        (1, 1, SLOT): (True, None),
+        (1, 2, SLOT): (False, {'start_time': [SLOT_TAKEN]}),
+        (999, 1, SLOT): (False, {'venue_id': ['unknown venue']}),
+        (taken.venue_id, 1, taken.start_time): (False, {'start_time': [SLOT_TAKEN]}),
+        (2, 2, SLOT): (True, None),
+    }
+    assert Show.query.count() == before + 2
+
+
+def test_insert_batch_falls_back_to_one_by_one(app, taken, monkeypatch):
+    # a concurrent writer takes the slot between the batch check and the
+    # flush: the unique constraint rejects the batch and the items are
+    # retried on their own
+    monkeypatch.setattr(show_writer, 'taken_slots', lambda slots: set())
+    before = Show.query.count()
+    results = insert_batch(app.extensions['profile_cache'], [
+        {'venue_id': 1, 'artist_id': 1, 'start_time': SLOT},
+        {'venue_id': taken.venue_id, 'artist_id': 1, 'start_time': taken.start_time},
+    ])
+
+    assert [(r[0]['venue_id'], r[1] is not None, r[2]) for r in results] == [
+        (1, True, None),
+        (taken.venue_id, False, {'start_time': [SLOT_TAKEN]}),
+    ]
+    assert Show.query.count() == before + 1
+
+
+def test_queued_submission_lifecycle(app, client, taken, monkeypatch):
+    monkeypatch.setitem(app.config, 'SHOW_WRITE_MODE', 'queued')
+    monkeypatch.setitem(app.extensions, 'show_writer', None)  # removed again afterwards
+    init_show_writer(app)
+    writer = app.extensions['show_writer']
+
+    def submit(venue_id, start_time):
+        response = client.post('/shows/create', data={
+            'venue_id': venue_id, 'artist_id': 1, 'start_time': start_time.strftime('%Y-%m-%d %H:%M:%S')})
+        return re.search(r'ticket ([0-9a-f]{32})', response.get_data(as_text=True)).group(1)
+
+    created = submit(1, SLOT)
+    clash = submit(taken.venue_id, taken.start_time)
+    unknown = submit(999, SLOT)
+    writer.join()
+
+    status = client.get('/shows/submissions/' + created).json
+    assert status['status'] == 'created'
+    assert db.session.get(Show, status['show_id']).start_time == SLOT
+    assert client.get('/shows/submissions/' + clash).json == {
+        'status': 'rejected', 'errors': {'start_time': [SLOT_TAKEN]}}
+    assert client.get('/shows/submissions/' + unknown).json == {
+        'status': 'rejected', 'errors': {'venue_id': ['unknown venue']}}
+    assert client.get('/shows/submissions/' + 'f' * 32).status_code == 404
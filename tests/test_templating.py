@@ -0,0 +1,33 @@
+import os
+import stat
+
+import pytest
+from jinja2 import FileSystemBytecodeCache
+
+from templating import make_bytecode_cache
+
+
+def test_default_cache_directory_is_jinjas_private_one():
+    cache = make_bytecode_cache({'TEMPLATE_BYTECODE_CACHE': 'filesystem'})
+    assert isinstance(cache, FileSystemBytecodeCache)
+    assert stat.S_IMODE(os.stat(cache.directory).st_mode) == 0o700
+    assert os.stat(cache.directory).st_uid == os.getuid()
+
+
+def test_configured_cache_directory_is_closed_to_others(tmp_path):
+    directory = tmp_path / 'jinja'
+    directory.mkdir(mode=0o777)
+    os.chmod(directory, 0o777)
+    cache = make_bytecode_cache({'TEMPLATE_BYTECODE_CACHE': 'filesystem',
+                                 'TEMPLATE_BYTECODE_CACHE_DIR': str(directory)})
+    assert cache.directory == str(directory)
+    assert stat.S_IMODE(os.stat(directory).st_mode) == 0o700
+
+
+def test_configured_cache_directory_may_not_be_a_symlink(tmp_path):
+    (tmp_path / 'elsewhere').mkdir()
+    link = tmp_path / 'jinja'
+    link.symlink_to(tmp_path / 'elsewhere')
+    with pytest.raises(RuntimeError):
+        make_bytecode_cache({'TEMPLATE_BYTECODE_CACHE': 'filesystem',
+                             'TEMPLATE_BYTECODE_CACHE_DIR': str(link)})